@@ -0,0 +1,310 @@
+# ==============================================================================
+# ARMAZENAMENTO: INTERFACE + IMPLEMENTAÇÃO FALSA (MEMÓRIA/DISCO)
+# ==============================================================================
+# O app conversa com a planilha pelo subconjunto da API do gspread descrito em
+# Planilha/Aba abaixo. O caminho real (gspread.Spreadsheet/Worksheet) já cumpre
+# essa interface; PlanilhaMemoria é uma implementação em memória, com latência
+# configurável e contagem de chamadas, usada no benchmark e em testes locais.
+# Nada aqui importa o Streamlit.
+import os
+import pickle
+import threading
+import time
+from typing import Protocol
+
+from gspread.cell import Cell
+from gspread.exceptions import WorksheetNotFound
+from gspread.utils import a1_range_to_grid_range
+
+import perfil_acoes
+
+# Planilha configurada por código (benchmark/CLI). Tem prioridade sobre o Google.
+_planilha_configurada = None
+
+
+def definir_planilha(planilha):
+    """Faz o app usar 'planilha' (ex.: PlanilhaMemoria) no lugar do Google Sheets. None desfaz."""
+    global _planilha_configurada
+    _planilha_configurada = planilha
+
+
+def planilha_configurada():
+    """Planilha definida por definir_planilha ou pela variável PLANILHA_MEMORIA_ARQUIVO (fake em disco)."""
+    global _planilha_configurada
+    if _planilha_configurada is None and os.environ.get("PLANILHA_MEMORIA_ARQUIVO"):
+        _planilha_configurada = PlanilhaMemoria.carregar(os.environ["PLANILHA_MEMORIA_ARQUIVO"])
+    return _planilha_configurada
+
+
+# ------------------------------------------------------------------------------
+# Interface
+# ------------------------------------------------------------------------------
+class Aba(Protocol):
+    """Aba (worksheet): leitura, escrita, limpeza, busca e append."""
+    title: str
+    id: int
+    row_count: int
+    col_count: int
+
+    def get_all_values(self): ...
+    def get_all_records(self): ...
+    def col_values(self, col): ...
+    def update(self, values, range_name=None, **kwargs): ...
+    def batch_update(self, data, **kwargs): ...
+    def batch_clear(self, ranges): ...
+    def clear(self): ...
+    def resize(self, rows=None, cols=None): ...
+    def add_rows(self, rows): ...
+    def find(self, query, in_column=None): ...
+    def append_row(self, values, **kwargs): ...
+
+
+class Planilha(Protocol):
+    """Planilha (spreadsheet): acesso e criação de abas + operações em lote."""
+
+    def worksheet(self, title): ...
+    def worksheets(self): ...
+    def add_worksheet(self, title, rows, cols): ...
+    def values_batch_get(self, ranges, params=None): ...
+    def values_batch_update(self, body): ...
+    def batch_update(self, body): ...
+
+
+# ------------------------------------------------------------------------------
+# Implementação em memória
+# ------------------------------------------------------------------------------
+def _separar_range(nome):
+    """"'Aba'!A1:B2" -> ('Aba', 'A1:B2'); "'Aba'" -> ('Aba', None)."""
+    if nome.startswith("'"):
+        fim = nome.index("'", 1)
+        while fim + 1 < len(nome) and nome[fim + 1] == "'":
+            fim = nome.index("'", fim + 2)
+        titulo = nome[1:fim].replace("''", "'")
+        resto = nome[fim + 1:]
+    else:
+        titulo, _, resto = nome.partition('!')
+        resto = '!' + resto if resto else ''
+    return titulo, (resto[1:] if resto.startswith('!') else None)
+
+
+class AbaMemoria:
+    def __init__(self, planilha, title, sheet_id, rows=1000, cols=26):
+        self.spreadsheet = planilha
+        self.title = title
+        self.id = sheet_id
+        self.row_count = rows
+        self.col_count = cols
+        self.celulas = [] # lista de linhas (listas de str), sem preenchimento obrigatório
+
+    # --- auxiliares internos ---
+    def _valores_uteis(self, linha_ini=0, linha_fim=None, col_ini=0, col_fim=None):
+        """Recorte como a API devolve: sem linhas/colunas vazias no final, linhas completadas."""
+        linhas = [l[col_ini:col_fim] for l in self.celulas[linha_ini:linha_fim]]
+        while linhas and not any(linhas[-1]): linhas.pop()
+        largura = max((max((i + 1 for i, v in enumerate(l) if v != ''), default=0) for l in linhas), default=0)
+        return [(l + [''] * largura)[:largura] for l in linhas]
+
+    def _escrever(self, range_name, values):
+        g = a1_range_to_grid_range(range_name or 'A1')
+        r0 = g.get('startRowIndex', 0); c0 = g.get('startColumnIndex', 0)
+        values = [list(l) for l in values]
+        with self.spreadsheet._lock: # escritas em lotes podem chegar de várias threads
+            if r0 + len(values) > self.row_count:
+                raise ValueError(f"Range ({self.title}!{range_name}) exceeds grid limits")
+            while len(self.celulas) < r0 + len(values): self.celulas.append([])
+            for i, linha in enumerate(values):
+                alvo = self.celulas[r0 + i]
+                if len(alvo) < c0 + len(linha): alvo.extend([''] * (c0 + len(linha) - len(alvo)))
+                alvo[c0:c0 + len(linha)] = ['' if v is None else str(v) for v in linha]
+            self.col_count = max(self.col_count, c0 + max((len(l) for l in values), default=0))
+
+    def _limpar(self, range_name):
+        g = a1_range_to_grid_range(range_name)
+        for linha in self.celulas[g.get('startRowIndex', 0):g.get('endRowIndex')]:
+            ini = g.get('startColumnIndex', 0); fim = min(g.get('endColumnIndex', len(linha)), len(linha))
+            linha[ini:fim] = [''] * max(0, fim - ini)
+
+    # --- leitura ---
+    def get_all_values(self):
+        self.spreadsheet._chamada("leitura")
+        return self._valores_uteis()
+
+    def get_all_records(self):
+        valores = self.get_all_values()
+        if not valores: return []
+        return [dict(zip(valores[0], l)) for l in valores[1:]]
+
+    def col_values(self, col):
+        self.spreadsheet._chamada("leitura")
+        valores = [l[col - 1] if len(l) >= col else '' for l in self.celulas]
+        while valores and valores[-1] == '': valores.pop()
+        return valores
+
+    def find(self, query, in_column=None):
+        self.spreadsheet._chamada("leitura")
+        for i, linha in enumerate(self.celulas):
+            colunas = [in_column - 1] if in_column else range(len(linha))
+            for j in colunas:
+                if j < len(linha) and linha[j] == query: return Cell(i + 1, j + 1, query)
+        return None
+
+    # --- escrita ---
+    def update(self, values, range_name=None, **kwargs):
+        if isinstance(values, str): values, range_name = range_name, values # ordem antiga do gspread
+        self.spreadsheet._chamada("escrita")
+        self._escrever(range_name, values)
+
+    def batch_update(self, data, **kwargs):
+        self.spreadsheet._chamada("escrita")
+        for item in data: self._escrever(item['range'], item['values'])
+
+    def batch_clear(self, ranges):
+        self.spreadsheet._chamada("escrita")
+        for r in ranges: self._limpar(r)
+
+    def clear(self):
+        self.spreadsheet._chamada("escrita")
+        self.celulas = []
+
+    def append_row(self, values, **kwargs):
+        self.spreadsheet._chamada("escrita")
+        n = len(self._valores_uteis())
+        if n + 1 > self.row_count: self.row_count = n + 1
+        self._escrever(f"A{n + 1}", [values])
+
+    def resize(self, rows=None, cols=None):
+        self.spreadsheet._chamada("escrita")
+        if rows is not None:
+            self.row_count = rows
+            del self.celulas[rows:]
+        if cols is not None:
+            self.col_count = cols
+            for linha in self.celulas: del linha[cols:]
+
+    def add_rows(self, rows):
+        self.spreadsheet._chamada("escrita")
+        self.row_count += rows
+
+
+class PlanilhaMemoria:
+    """
+    Planilha falsa com a mesma interface usada do gspread.
+    latencia_leitura/latencia_escrita: segundos de espera por chamada (simula a rede).
+    chamadas: contador {'leitura': n, 'escrita': n}.
+    """
+
+    def __init__(self, latencia_leitura=0.0, latencia_escrita=0.0):
+        self.latencia_leitura = latencia_leitura
+        self.latencia_escrita = latencia_escrita
+        self.chamadas = {"leitura": 0, "escrita": 0}
+        self.abas = {}
+        self._proximo_id = 0
+        self._lock = threading.Lock()
+
+    def _chamada(self, tipo):
+        with self._lock: self.chamadas[tipo] += 1
+        perfil_acoes.registrar_chamada(tipo)
+        espera = self.latencia_leitura if tipo == "leitura" else self.latencia_escrita
+        if espera: time.sleep(espera)
+
+    def _aba_por_id(self, sheet_id):
+        return next(a for a in self.abas.values() if a.id == sheet_id)
+
+    # --- carga de dados (fora da contagem de chamadas) ---
+    def criar_aba(self, title, valores, rows=None, cols=None):
+        aba = AbaMemoria(self, title, self._proximo_id, rows or max(1000, len(valores)),
+                         cols or max(26, max((len(l) for l in valores), default=0)))
+        self._proximo_id += 1
+        aba.celulas = [[str(v) for v in l] for l in valores]
+        self.abas[title] = aba
+        return aba
+
+    # --- interface ---
+    def worksheet(self, title):
+        self._chamada("leitura")
+        if title not in self.abas: raise WorksheetNotFound(title)
+        return self.abas[title]
+
+    def worksheets(self):
+        self._chamada("leitura")
+        return list(self.abas.values())
+
+    def add_worksheet(self, title, rows, cols):
+        self._chamada("escrita")
+        aba = AbaMemoria(self, title, self._proximo_id, rows, cols)
+        self._proximo_id += 1
+        self.abas[title] = aba
+        return aba
+
+    def values_batch_get(self, ranges, params=None):
+        self._chamada("leitura")
+        saida = []
+        for nome in ranges:
+            titulo, a1 = _separar_range(nome)
+            aba = self.abas[titulo]
+            if a1:
+                g = a1_range_to_grid_range(a1)
+                valores = aba._valores_uteis(g.get('startRowIndex', 0), g.get('endRowIndex'),
+                                             g.get('startColumnIndex', 0), g.get('endColumnIndex'))
+            else:
+                valores = aba._valores_uteis()
+            saida.append({"range": nome, "values": valores} if valores else {"range": nome})
+        return {"valueRanges": saida}
+
+    def values_batch_update(self, body):
+        """Valores em várias abas numa chamada: body = {'valueInputOption', 'data': [{'range': "'Aba'!A1:B2", 'values'}]}."""
+        self._chamada("escrita")
+        for item in body.get("data", []):
+            titulo, a1 = _separar_range(item["range"])
+            self.abas[titulo]._escrever(a1, item["values"])
+        return {}
+
+    def batch_update(self, body):
+        self._chamada("escrita")
+        for req in body.get("requests", []):
+            tipo, d = next(iter(req.items()))
+            if tipo == "appendDimension":
+                aba = self._aba_por_id(d["sheetId"])
+                if d["dimension"] == "ROWS": aba.row_count += d["length"]
+                else: aba.col_count += d["length"]
+                continue
+            if tipo == "addSheet":
+                p = d["properties"]; grade = p.get("gridProperties", {})
+                aba = AbaMemoria(self, p["title"], self._proximo_id, grade.get("rowCount", 1000), grade.get("columnCount", 26))
+                self._proximo_id += 1
+                self.abas[p["title"]] = aba
+                continue
+            if tipo == "updateSheetProperties":
+                p = d["properties"]; grade = p.get("gridProperties", {})
+                aba = self._aba_por_id(p["sheetId"])
+                if "rowCount" in grade:
+                    aba.row_count = grade["rowCount"]; del aba.celulas[aba.row_count:]
+                if "columnCount" in grade: aba.col_count = grade["columnCount"]
+                continue
+            r = d["range"]; aba = self._aba_por_id(r["sheetId"])
+            if r["dimension"] != "ROWS": raise NotImplementedError(f"{tipo} em colunas")
+            if tipo == "deleteDimension":
+                del aba.celulas[r["startIndex"]:r["endIndex"]]
+                aba.row_count -= r["endIndex"] - r["startIndex"]
+            elif tipo == "insertDimension":
+                if r["startIndex"] >= aba.row_count: raise ValueError("insertDimension além da grade")
+                while len(aba.celulas) < r["startIndex"]: aba.celulas.append([])
+                aba.celulas[r["startIndex"]:r["startIndex"]] = [[] for _ in range(r["endIndex"] - r["startIndex"])]
+                aba.row_count += r["endIndex"] - r["startIndex"]
+            else:
+                raise NotImplementedError(tipo)
+        return {}
+
+    # --- persistência em disco ---
+    def salvar(self, caminho):
+        with open(caminho, 'wb') as f:
+            pickle.dump({t: (a.row_count, a.col_count, a.celulas) for t, a in self.abas.items()}, f)
+
+    @classmethod
+    def carregar(cls, caminho, **kwargs):
+        planilha = cls(**kwargs)
+        if os.path.exists(caminho):
+            with open(caminho, 'rb') as f:
+                for titulo, (rows, cols, celulas) in pickle.load(f).items():
+                    planilha.criar_aba(titulo, celulas, rows, cols)
+        return planilha
@@ -0,0 +1,196 @@
+# ==============================================================================
+# BENCHMARK DAS AÇÕES COM DADOS SINTÉTICOS
+# ==============================================================================
+# Gera uma planilha falsa (armazenamento.PlanilhaMemoria) no formato do BaseCamp
+# e mede, ponta a ponta, as ações do motor (motor_planilha): tempo de parede, chamadas à
+# "API", pico de memória alocada (tracemalloc) e pico de RSS do processo.
+#
+# Uso:
+#   python benchmark_planilha.py                       # 10k e 100k linhas
+#   python benchmark_planilha.py --linhas 10000 100000 500000 --meses 24
+#   python benchmark_planilha.py --latencia-leitura 0.3 --latencia-escrita 0.5 --json resultado.json
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+_DIR_TEMP = tempfile.mkdtemp(prefix="bench_planilha_")
+os.environ["ESPELHO_PLANILHA_SQLITE"] = os.path.join(_DIR_TEMP, "espelho.sqlite")
+
+import armazenamento
+import motor_planilha as g
+from armazenamento import PlanilhaMemoria
+
+LIDERES = ["Carla Souza", "Marcos Lima", "Paula Reis"]
+ENCARREGADOS = [f"Pessoa {i:02d}" for i in range(40)]
+
+
+def _meses_ate_hoje(n):
+    hoje = datetime.now()
+    ano, mes = hoje.year, hoje.month
+    meses = []
+    for _ in range(n):
+        meses.append((ano, mes))
+        mes -= 1
+        if mes == 0: mes, ano = 12, ano - 1
+    return list(reversed(meses))
+
+
+def gerar_planilha(n_linhas, n_meses, latencia_leitura=0.0, latencia_escrita=0.0, semente=42):
+    """Cria a PlanilhaMemoria com origem, Equipes, HistoricoDiario vazio e n_meses abas de mês."""
+    rng = np.random.default_rng(semente)
+    meses = _meses_ate_hoje(n_meses)
+    inicio = np.datetime64(f"{meses[0][0]}-{meses[0][1]:02d}-01")
+    dias = int((np.datetime64(datetime.now().date()) - inicio).astype(int)) + 1
+
+    datas = pd.Series(inicio + rng.integers(0, dias, n_linhas).astype('timedelta64[D]'))
+    seg_br = (datas - pd.to_timedelta(datas.dt.dayofweek, unit='D')).dt.strftime('%d/%m/%Y').to_numpy(dtype=object)
+
+    sorteio = rng.random(n_linhas)
+    lista = ("Semana " + seg_br).astype(object)
+    lista[sorteio < 0.10] = "Backlog"
+    arquivadas = (sorteio >= 0.10) & (sorteio < 0.15)
+    lista[arquivadas] = "[ARCHIVED] " + lista[arquivadas]
+
+    # Data Final mistura ISO, BR, vazio e lixo, como na origem real
+    formato = rng.random(n_linhas)
+    data_final = np.where(formato < 0.35, datas.dt.strftime('%Y-%m-%d').to_numpy(dtype=object),
+                          np.where(formato < 0.70, datas.dt.strftime('%d/%m/%Y').to_numpy(dtype=object), '')).astype(object)
+    data_final[formato > 0.99] = "a definir"
+    data_final[lista == "Backlog"] = ''
+
+    ids = (1_000_000 + np.arange(n_linhas)).astype(str).astype(object)
+    links = "https://3.basecamp.com/4000000/buckets/123/todos/" + ids
+    encarregado = np.array(ENCARREGADOS, dtype=object)[rng.integers(0, len(ENCARREGADOS), n_linhas)]
+    nome = "Tarefa sintética " + ids
+    peso = rng.integers(1, 6, n_linhas).astype(str).astype(object)
+
+    cabecalho = ["Nome Task", "Link", "Lista", "Encarregado", "Data Final", "Peso"] + LIDERES
+    colunas = [nome, links, lista, encarregado, data_final, peso] + [np.where(rng.random(n_linhas) < 0.5, "1", "")] * len(LIDERES)
+    origem = [cabecalho] + [list(l) for l in zip(*[c.tolist() for c in colunas])]
+
+    planilha = PlanilhaMemoria(latencia_leitura, latencia_escrita)
+    planilha.criar_aba(g.PLANILHA_ORIGEM_NOME, origem)
+    planilha.criar_aba(g.PLANILHA_EQUIPES_NOME, [["Nome", "Posição"]] + [[n, "Lider"] for n in LIDERES] +
+                       [[n, "Membro"] for n in ENCARREGADOS])
+
+    # Abas de mês: snapshot de cada mês (tarefas com Data Final no mês, sem arquivadas e sem colunas de líder)
+    ano_mes = (datas.dt.year * 100 + datas.dt.month).to_numpy()
+    ativas = ~arquivadas & (data_final != '')
+    cab_mes = ["Nome Task", "Link", "Lista", "Encarregado", "Data Final", "Peso", "ID"]
+    for ano, mes in meses:
+        sel = np.flatnonzero(ativas & (ano_mes == ano * 100 + mes))
+        linhas = [cab_mes] + [[nome[i], links[i], lista[i], encarregado[i], data_final[i], peso[i], ids[i]] for i in sel]
+        planilha.criar_aba(f"{g.MESES_NUM_PT[mes]} {ano}", linhas)
+    return planilha
+
+
+def _rss_mb():
+    """RSS atual do processo (Linux, /proc). None em outros sistemas."""
+    try:
+        with open("/proc/self/statm") as f: return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2 ** 20
+    except (OSError, ValueError): return None
+
+
+class _MonitorRSS(threading.Thread):
+    """Amostra o RSS a cada 5 ms enquanto a ação roda e guarda o pico."""
+
+    def __init__(self):
+        super().__init__(daemon=True)
+        self.pico = _rss_mb()
+        self.parar = threading.Event()
+
+    def run(self):
+        while not self.parar.wait(0.005):
+            atual = _rss_mb()
+            if atual is not None and (self.pico is None or atual > self.pico): self.pico = atual
+
+
+def _medir(nome, func, planilha, usar_tracemalloc=True):
+    antes = dict(planilha.chamadas)
+    rss_antes = _rss_mb()
+    monitor = _MonitorRSS(); monitor.start()
+    if usar_tracemalloc: tracemalloc.start()
+    inicio = time.perf_counter()
+    resultado = func()
+    duracao = time.perf_counter() - inicio
+    pico = tracemalloc.get_traced_memory()[1] if usar_tracemalloc else None
+    if usar_tracemalloc: tracemalloc.stop()
+    monitor.parar.set(); monitor.join()
+    return {
+        "acao": nome,
+        "segundos": round(duracao, 3),
+        "leituras": planilha.chamadas["leitura"] - antes["leitura"],
+        "escritas": planilha.chamadas["escrita"] - antes["escrita"],
+        "pico_mem_mb": round(pico / 2 ** 20, 1) if pico is not None else None,
+        "pico_rss_mb": round(monitor.pico, 1) if monitor.pico is not None else None,
+        "delta_rss_mb": round(monitor.pico - rss_antes, 1) if monitor.pico is not None else None,
+        "resultado": str(resultado)[:80],
+    }
+
+
+def rodar(n_linhas, n_meses, latencia_leitura, latencia_escrita, frio=True, usar_tracemalloc=True):
+    planilha = gerar_planilha(n_linhas, n_meses, latencia_leitura, latencia_escrita)
+    armazenamento.definir_planilha(planilha)
+    g.invalidar_snapshot_origem()
+
+    id_para_deletar = planilha.abas[g.PLANILHA_ORIGEM_NOME].celulas[1][1].split('/')[-1]
+    ids_lote = [l[1].split('/')[-1] for l in planilha.abas[g.PLANILHA_ORIGEM_NOME].celulas[2:n_linhas:max(1, n_linhas // 50)]]
+    acoes = [
+        ("sincronizar_mes_atual", lambda: g.sincronizar_basecamp_com_mes_especifico(g.obter_nome_aba_mes_atual())),
+        ("atualizar_backlog", g.atualizar_aba_backlog),
+        ("consolidar (completo)", g.consolidar_geral_para_dashboard),
+        ("consolidar (sem mudança)", g.consolidar_geral_para_dashboard),
+        ("historico_diario", g.atualizar_historico_diario),
+        ("deletar_tarefa", lambda: g.deletar_tarefa_global(id_para_deletar)),
+        ("deletar_lote_50", lambda: sum(g.deletar_tarefas_global(ids_lote).values())),
+    ]
+    resultados = []
+    for nome, func in acoes:
+        if frio: g.invalidar_snapshot_origem()
+        r = _medir(nome, func, planilha, usar_tracemalloc)
+        r.update({"linhas": n_linhas, "meses": n_meses})
+        resultados.append(r)
+    armazenamento.definir_planilha(None)
+    return resultados
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark das ações do gerenciador com dados sintéticos.")
+    parser.add_argument("--linhas", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--meses", type=int, default=24)
+    parser.add_argument("--latencia-leitura", type=float, default=0.0, help="segundos por chamada de leitura")
+    parser.add_argument("--latencia-escrita", type=float, default=0.0, help="segundos por chamada de escrita")
+    parser.add_argument("--quente", action="store_true", help="não invalida o snapshot da origem entre as ações")
+    parser.add_argument("--sem-tracemalloc", action="store_true",
+                        help="não usa tracemalloc (mais rápido; o pico de RSS continua sendo medido)")
+    parser.add_argument("--json", help="grava os resultados neste arquivo")
+    args = parser.parse_args()
+
+    todos = []
+    print(f"{'linhas':>8} | {'ação':<26} | {'tempo (s)':>9} | {'leit.':>5} | {'escr.':>5} | {'pico MB':>8} | "
+          f"{'RSS MB':>8} | {'ΔRSS MB':>8} | resultado")
+    print("-" * 130)
+    fmt = lambda v: f"{v:>8.1f}" if v is not None else f"{'-':>8}"
+    for n in args.linhas:
+        for r in rodar(n, args.meses, args.latencia_leitura, args.latencia_escrita, frio=not args.quente,
+                       usar_tracemalloc=not args.sem_tracemalloc):
+            todos.append(r)
+            print(f"{r['linhas']:>8} | {r['acao']:<26} | {r['segundos']:>9.3f} | {r['leituras']:>5} | "
+                  f"{r['escritas']:>5} | {fmt(r['pico_mem_mb'])} | {fmt(r['pico_rss_mb'])} | {fmt(r['delta_rss_mb'])} | "
+                  f"{r['resultado'][:40]}")
+            sys.stdout.flush()
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f: json.dump(todos, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+# ==============================================================================
+# CLI DAS AÇÕES DO GERENCIADOR (CRON / LINHA DE COMANDO)
+# ==============================================================================
+# Roda as ações do motor_planilha sem o Streamlit, com o tempo de cada uma.
+# Credenciais e URL: variáveis GCP_SERVICE_ACCOUNT_JSON / SHEET_URL,
+# .streamlit/secrets.toml ou google_credentials.json (ver motor_planilha).
+#
+# Uso:
+#   python cli_planilha.py todas                       # sincronizar mês atual, backlog, consolidar, histórico
+#   python cli_planilha.py sincronizar --aba "Março 2025"
+#   python cli_planilha.py sincronizar --aba "Janeiro 2025" "Fevereiro 2025" "Março 2025"   # uma leitura da origem
+#   python cli_planilha.py consolidar --json tempos.json
+#   python cli_planilha.py todas --perfil perfil.csv       # etapas de cada ação (tempo, chamadas, células...)
+#   python cli_planilha.py deletar 123456 789012
+#   python cli_planilha.py conciliar --relatorio divergencias.csv   # abas de mês x consolidada
+#   python cli_planilha.py conciliar --aba "Novembro 2025"
+#   python cli_planilha.py todas --planilha-memoria fake.pkl --salvar   # planilha falsa em disco
+#   python cli_planilha.py inicializacao              # só mede o cold start (imports)
+import time
+
+_INICIO = time.perf_counter()
+
+import argparse
+import json
+import logging
+import os
+import sys
+
+import motor_planilha as motor
+import perfil_acoes
+
+_IMPORTACAO_MOTOR = time.perf_counter() - _INICIO
+
+ACOES = ["sincronizar", "backlog", "consolidar", "historico", "deletar", "conciliar", "todas", "inicializacao"]
+
+
+def _conciliar(args):
+    """Concilia as abas de mês com a consolidada, imprime o relatório e, se pedido, grava as divergências."""
+    import conciliacao
+    resultado = conciliacao.conciliar(abas=args.aba)
+    print(conciliacao.relatorio_texto(resultado, args.exemplos), end="\n\n")
+    if args.relatorio: resultado["divergencias"].to_csv(args.relatorio, index=False)
+    return conciliacao.resumir(resultado)
+
+
+def _plano(args):
+    """Lista de (nome, função) a executar, na ordem."""
+    sincronizar = lambda: motor.sincronizar_meses(args.aba or [motor.obter_nome_aba_mes_atual()])
+    por_nome = {
+        "sincronizar": sincronizar,
+        "backlog": motor.atualizar_aba_backlog,
+        "consolidar": motor.consolidar_geral_para_dashboard,
+        "historico": motor.atualizar_historico_diario,
+        "deletar": lambda: motor.deletar_tarefas_global(args.ids),
+        "conciliar": lambda: _conciliar(args),
+    }
+    if args.acao == "todas": return [(n, por_nome[n]) for n in ("sincronizar", "backlog", "consolidar", "historico")]
+    return [(args.acao, por_nome[args.acao])]
+
+
+def _falhou(resultado):
+    return isinstance(resultado, str) and resultado.startswith("Erro")
+
+
+def medir_inicializacao():
+    """Tempo (s) de importar o motor e de carregar as bibliotecas que ele adia (primeiro uso)."""
+    tempos = {"importar_motor": round(_IMPORTACAO_MOTOR, 3)}
+    for nome, modulo in (("pandas", motor.pd), ("numpy", motor.np), ("gspread", motor.gspread),
+                         ("espelho_local", motor.espelho_local), ("armazenamento", motor.armazenamento)):
+        inicio = time.perf_counter()
+        getattr(modulo, "__name__")
+        tempos[nome] = round(time.perf_counter() - inicio, 3)
+    return tempos
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Ações do gerenciador da planilha, sem o Streamlit.")
+    parser.add_argument("acao", choices=ACOES)
+    parser.add_argument("ids", nargs="*", help="IDs para 'deletar'")
+    parser.add_argument("--aba", nargs="+", help="aba(s) de mês para 'sincronizar' (padrão: mês atual, ex.: 'Março 2025') "
+                                                   "ou 'conciliar' (padrão: todas)")
+    parser.add_argument("--url", help="URL da planilha (padrão: SHEET_URL)")
+    parser.add_argument("--planilha-memoria", help="usa uma planilha falsa salva em disco (armazenamento.PlanilhaMemoria)")
+    parser.add_argument("--salvar", action="store_true", help="com --planilha-memoria: grava a planilha de volta no arquivo")
+    parser.add_argument("--json", help="grava os tempos e resultados neste arquivo")
+    parser.add_argument("--relatorio", help="com 'conciliar': grava as divergências neste CSV")
+    parser.add_argument("--exemplos", type=int, default=10, help="com 'conciliar': linhas de exemplo por motivo")
+    parser.add_argument("--perfil", help="grava o perfil por etapa das ações (.json ou .csv, pela extensão)")
+    parser.add_argument("-v", "--verbose", action="store_true", help="log detalhado")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING,
+                        format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    if args.acao == "deletar" and not args.ids: parser.error("informe os IDs para deletar")
+    if args.url: os.environ["SHEET_URL"] = args.url
+    if args.planilha_memoria: os.environ["PLANILHA_MEMORIA_ARQUIVO"] = args.planilha_memoria
+
+    print(f"motor importado em {_IMPORTACAO_MOTOR * 1000:.0f} ms")
+    if args.acao == "inicializacao":
+        tempos = medir_inicializacao()
+        for nome, segundos in tempos.items(): print(f"{nome:<16} {segundos * 1000:>8.0f} ms")
+        if args.json:
+            with open(args.json, 'w', encoding='utf-8') as f: json.dump(tempos, f, indent=2)
+        return 0
+
+    planilha = motor.obter_spreadsheet_cacheada()
+    if planilha is None:
+        print("Erro: não foi possível abrir a planilha (ver credenciais/SHEET_URL)", file=sys.stderr)
+        return 2
+
+    # Chamadas contadas pela própria planilha falsa; no Google, pelo limitador de cota
+    contar = lambda uso: (dict(planilha.chamadas) if hasattr(planilha, "chamadas")
+                          else {"leitura": uso.get("leituras", 0), "escrita": uso.get("escritas", 0)})
+    resultados = []
+    print(f"{'ação':<12} | {'tempo (s)':>9} | {'leit.':>5} | {'escr.':>5} | resultado")
+    print("-" * 80)
+    for nome, func in _plano(args):
+        inicio = time.perf_counter(); antes = contar({})
+        with perfil_acoes.perfilar_acao(nome) as perfil:
+            try: resultado = func()
+            except Exception as e:
+                logging.getLogger("cli_planilha").exception("Ação '%s' falhou", nome)
+                resultado = f"Erro: {e}"
+            perfil.resultado = str(resultado)
+        segundos = time.perf_counter() - inicio; depois = contar(perfil.uso_cota)
+        leituras, escritas = (depois[k] - antes.get(k, 0) for k in ("leitura", "escrita"))
+        resultados.append({"acao": nome, "segundos": round(segundos, 3), "leituras": leituras,
+                           "escritas": escritas, "resultado": str(resultado)})
+        print(f"{nome:<12} | {segundos:>9.3f} | {leituras:>5} | {escritas:>5} | {str(resultado)[:80]}")
+        sys.stdout.flush()
+    total = time.perf_counter() - _INICIO
+    print(f"total (incluindo a inicialização): {total:.3f} s")
+
+    if args.planilha_memoria and args.salvar: planilha.salvar(args.planilha_memoria)
+    if args.perfil: perfil_acoes.gravar_perfis(args.perfil, list(reversed(perfil_acoes.listar_perfis())))
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({"importar_motor_s": round(_IMPORTACAO_MOTOR, 3), "total_s": round(total, 3),
+                       "acoes": resultados}, f, ensure_ascii=False, indent=2)
+    return 1 if any(_falhou(r["resultado"]) for r in resultados) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
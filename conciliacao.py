@@ -0,0 +1,157 @@
+# ==============================================================================
+# CONCILIAÇÃO: ABAS DE MÊS x ABA CONSOLIDADA
+# ==============================================================================
+# Substitui os scripts avulsos de investigação (comparar_perda_dados.py e
+# investigacao_<mês>.py, um por mês, com set() de IDs e iterrows).
+# Lê só as colunas usadas (ID/Link, Fonte_Dados, Encarregado, Lista, Data Final)
+# de todas as abas de mês e da 'Total BaseCamp para Notas' numa única chamada
+# values_batch_get (motor_planilha.ler_colunas_em_lote), cruza cada aba com o
+# seu bloco na consolidada (Fonte_Dados = 'Snapshot: <aba>') com um
+# merge(indicator=True) e classifica todas as linhas de uma vez, sem laço por linha:
+#   situacao: 'só na aba de mês' | 'só no consolidado' | 'nos dois'
+#   motivo:   por que a linha diverge (arquivada, duplicada, em outro mês...)
+#   data:     'Data Final' x mês da aba ('mês errado', 'data ilegível' e, em
+#             meses passados, 'sem data')
+# Usado pela tela (expander de Diagnóstico) e pelo CLI (cli_planilha.py conciliar).
+# Nada aqui importa o Streamlit.
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+import motor_planilha as motor
+from conversao_datas import VALORES_VAZIOS, converter_data_robusta
+from perfil_acoes import etapa
+
+PREFIXO_FONTE = "Snapshot: " # Fonte_Dados dos blocos da consolidada (ver motor_planilha._limpar_bloco_mes)
+COLUNAS_DETALHE = ["Encarregado", "Lista", "Data Final"]
+
+SO_NA_ABA = "só na aba de mês"
+SO_NO_CONSOLIDADO = "só no consolidado"
+NOS_DOIS = "nos dois"
+
+
+def _projetar(valores, colunas):
+    """
+    DataFrame (texto) só com 'colunas' + 'ID' (pelo Link, como regenerar_id_pelo_link) e 'Linha'
+    (número da linha na planilha). Colunas ausentes vêm vazias; linhas sem ID ficam de fora.
+    """
+    if not valores: return pd.DataFrame(columns=['ID', 'Linha'] + colunas)
+    cabecalho = [str(c).strip() for c in motor.colunas_de_cabecalho(valores[0])]
+    posicao = {c: i for i, c in enumerate(cabecalho)}
+    linhas = valores[1:]
+    df = pd.DataFrame({c: [l[posicao[c]] if posicao[c] < len(l) else '' for l in linhas] if c in posicao else [''] * len(linhas)
+                       for c in dict.fromkeys(['Link', 'ID'] + colunas)}, dtype=object)
+    if 'Link' in posicao: df['ID'] = df['Link'].astype(str).str.split('/').str[-1].str.strip()
+    df['Linha'] = np.arange(2, len(df) + 2)
+    return df.loc[df['ID'] != '', ['ID', 'Linha'] + colunas]
+
+
+def conciliar_valores(valores_meses, valores_consolidado, apenas_abas=False):
+    """
+    Concilia {aba: valores} das abas de mês com os valores da aba consolidada (formato de get_all_values).
+    apenas_abas=True: só os blocos da consolidada das abas passadas entram na comparação.
+    Retorna {'resumo': DataFrame por aba, 'divergencias': DataFrame das linhas com motivo ou data a revisar}.
+    """
+    with etapa("projetar abas", linhas_entrada=sum(max(len(v) - 1, 0) for v in valores_meses.values())):
+        partes = [_projetar(valores, COLUNAS_DETALHE).assign(Aba=titulo) for titulo, valores in valores_meses.items()]
+        meses = pd.concat(partes, ignore_index=True) if partes else _projetar([], COLUNAS_DETALHE).assign(Aba='')
+        meses['Fonte_Dados'] = PREFIXO_FONTE + meses['Aba'].astype(str)
+        cons = _projetar(valores_consolidado, ['Fonte_Dados'] + COLUNAS_DETALHE)
+        fontes_meses = set(PREFIXO_FONTE + t for t in valores_meses)
+        if apenas_abas: cons = cons[cons['Fonte_Dados'].isin(fontes_meses)]
+
+    with etapa("cruzar e classificar", linhas_entrada=len(meses) + len(cons)) as medicao:
+        # Duplicatas viram pares (ID, ocorrência): a 2a cópia de um ID só casa com a 2a cópia do outro lado
+        for df in (meses, cons): df['_ocorrencia'] = df.groupby(['Fonte_Dados', 'ID']).cumcount()
+        pares = meses.merge(cons, on=['Fonte_Dados', 'ID', '_ocorrencia'], how='outer',
+                            suffixes=('', '_consolidado'), indicator=True)
+        so_aba = (pares['_merge'] == 'left_only').to_numpy()
+        so_cons = (pares['_merge'] == 'right_only').to_numpy()
+        pares['Aba'] = pares['Fonte_Dados'].str.removeprefix(PREFIXO_FONTE)
+        for c in COLUNAS_DETALHE: pares[c] = pares[c].fillna(pares[c + '_consolidado'])
+        pares = motor.classificar_lista(pares)
+        arquivada = pares[motor.COL_ARQUIVADA].to_numpy(dtype=bool)
+        duplicada = (pares['_ocorrencia'] > 0).to_numpy()
+
+        # Motivo (na ordem de prioridade de cada np.select)
+        fonte_no_cons = pares['Fonte_Dados'].isin(set(cons['Fonte_Dados'])).to_numpy()
+        id_no_cons = pares['ID'].isin(set(cons['ID'])).to_numpy()
+        id_em_meses = pares['ID'].isin(set(meses['ID'])).to_numpy()
+        fonte_existe = pares['Fonte_Dados'].isin(fontes_meses).to_numpy()
+        motivo = np.select(
+            [so_aba & arquivada, so_aba & duplicada, so_aba & ~fonte_no_cons, so_aba & id_no_cons, so_aba,
+             so_cons & ~fonte_existe, so_cons & duplicada, so_cons & id_em_meses, so_cons,
+             arquivada],
+            ["arquivada (fica fora do consolidado)", "duplicada na aba", "mês ainda não consolidado",
+             "consolidada em outro mês", "não explicada",
+             "aba de mês inexistente", "duplicada no consolidado", "está em outra aba de mês",
+             "removida da aba (consolidado desatualizado)",
+             "arquivada, mas ainda no consolidado"], '')
+
+        # Data Final x mês da aba
+        mes_ano = {t: motor.extrair_mes_ano_da_aba(t) for t in pares['Aba'].dropna().unique()}
+        alvo = pares['Aba'].map({t: m[1] * 100 + m[0] for t, m in mes_ano.items() if m}).to_numpy(dtype=float)
+        datas = converter_data_robusta(pares['Data Final'])
+        vazia = pares['Data Final'].fillna('').astype(str).str.strip().isin(VALORES_VAZIOS).to_numpy()
+        hoje = datetime.now()
+        data = np.select([vazia & (alvo < hoje.year * 100 + hoje.month), vazia, datas.isna().to_numpy(),
+                          (datas.dt.year * 100 + datas.dt.month).to_numpy() != alvo],
+                         ["sem data", "", "data ilegível", "mês errado"], '')
+        data[np.isnan(alvo)] = ''
+
+        pares['situacao'] = np.select([so_aba, so_cons], [SO_NA_ABA, SO_NO_CONSOLIDADO], NOS_DOIS)
+        pares['motivo'] = motivo
+        pares['data'] = data
+        medicao.linhas_saida = len(pares)
+
+    indicadores = pd.DataFrame({
+        "Aba": pares['Aba'], "linhas_aba": ~so_cons, "linhas_consolidado": ~so_aba, SO_NA_ABA: so_aba,
+        SO_NO_CONSOLIDADO: so_cons, "arquivadas": arquivada & ~so_cons, "duplicadas": duplicada,
+        "mês errado": data == "mês errado", "data ilegível": data == "data ilegível", "sem data": data == "sem data"})
+    resumo = indicadores.groupby("Aba").sum()
+    resumo = resumo.loc[sorted(resumo.index, key=lambda t: (mes_ano.get(t) or (0, 0))[::-1])]
+
+    colunas = ['Aba', 'ID', 'situacao', 'motivo', 'data'] + COLUNAS_DETALHE + ['Linha', 'Linha_consolidado']
+    divergencias = pares.loc[(motivo != '') | (data != ''), colunas]
+    divergencias[['Linha', 'Linha_consolidado']] = divergencias[['Linha', 'Linha_consolidado']].astype('Int64')
+    return {"resumo": resumo, "divergencias": divergencias.sort_values(['Aba', 'situacao', 'motivo'], kind='stable')
+            .reset_index(drop=True)}
+
+
+def conciliar(spreadsheet=None, abas=None):
+    """
+    Lê as colunas necessárias das abas de mês (todas ou só 'abas') e da consolidada numa única chamada
+    values_batch_get (mais uma para os cabeçalhos fora do cache) e concilia.
+    Levanta RuntimeError se alguma aba não puder ser lida.
+    """
+    spreadsheet = spreadsheet or motor.obter_spreadsheet_cacheada()
+    titulos = [ws.title for ws in spreadsheet.worksheets()]
+    meses = sorted((t for t in titulos if motor.extrair_mes_ano_da_aba(t)), key=lambda t: motor.extrair_mes_ano_da_aba(t)[::-1])
+    if abas: meses = [t for t in meses if t in set(abas)]
+    ler = meses + ([motor.PLANILHA_CONSOLIDADA_NOME] if motor.PLANILHA_CONSOLIDADA_NOME in titulos else [])
+    colunas = ['ID', 'Fonte_Dados'] + COLUNAS_DETALHE
+    valores = motor.ler_colunas_em_lote(spreadsheet, {t: colunas for t in ler})
+    falhas = [t for t in ler if t not in valores]
+    if falhas: raise RuntimeError(f"Erro ao ler as abas: {', '.join(falhas)}")
+    return conciliar_valores({t: valores[t] for t in meses}, valores.get(motor.PLANILHA_CONSOLIDADA_NOME, []),
+                             apenas_abas=bool(abas))
+
+
+def resumir(resultado):
+    """Uma linha, no formato dos resultados das ações ('OK! ...')."""
+    div = resultado["divergencias"]
+    faltam = int((div['situacao'] == SO_NA_ABA).sum()); sobram = int((div['situacao'] == SO_NO_CONSOLIDADO).sum())
+    return (f"OK! {len(resultado['resumo'])} aba(s): {faltam} linha(s) só nas abas de mês, {sobram} só no consolidado, "
+            f"{int((div['data'] != '').sum())} com data a revisar.")
+
+
+def relatorio_texto(resultado, exemplos=10):
+    """Relatório para o terminal: resumo por aba e exemplos de cada motivo/diagnóstico de data."""
+    div = resultado["divergencias"]
+    partes = ["RESUMO POR ABA", resultado["resumo"].to_string(), "", resumir(resultado)]
+    for coluna in ("motivo", "data"):
+        for valor, grupo in div[div[coluna] != ''].groupby(coluna, sort=False):
+            partes += ["", f"{coluna.upper()}: {valor} ({len(grupo)})",
+                       grupo.head(exemplos).drop(columns=[coluna]).to_string(index=False)]
+    return "\n".join(partes)
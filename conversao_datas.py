@@ -0,0 +1,48 @@
+# ==============================================================================
+# CONVERSÃO DE DATAS (ISO + BR)
+# ==============================================================================
+# Motor único de datas do projeto (app, diagnóstico e conciliação).
+# A coluna 'Data Final' mistura 'AAAA-MM-DD' e 'DD/MM/AAAA' (às vezes com hora),
+# então o formato é detectado por valor:
+#   1. só os valores DISTINTOS são convertidos e o resultado é mapeado de volta;
+#   2. ISO e BR "puros" usam formato explícito (caminho rápido, sem inferência);
+#   3. o resto (com hora, dia/mês com 1 dígito...) tenta ISO8601 e depois dia-primeiro.
+import pandas as pd
+
+VALORES_VAZIOS = ['', 'nan', 'None', 'NaT', '0', '#N/A']
+_RE_ISO = r'^\d{4}-\d{2}-\d{2}$'
+_RE_BR = r'^\d{2}/\d{2}/\d{4}$'
+
+
+def analisar_datas(series):
+    """
+    Converte uma série de textos em datetime64.
+    Retorna (datas, invalidos): 'datas' alinhada ao índice de 'series' (NaT para vazios/ilegíveis)
+    e 'invalidos' com os valores distintos, não vazios, que não puderam ser lidos.
+    """
+    codigos, unicos = pd.factorize(series.fillna('').astype(str), use_na_sentinel=False)
+    texto = pd.Series(unicos, dtype=object).str.strip()
+    datas = pd.Series(pd.NaT, index=texto.index, dtype='datetime64[ns]')
+
+    vazios = texto.isin(VALORES_VAZIOS)
+    iso = texto.str.match(_RE_ISO)
+    br = texto.str.match(_RE_BR)
+    if iso.any(): datas[iso] = pd.to_datetime(texto[iso], format='%Y-%m-%d', errors='coerce')
+    if br.any(): datas[br] = pd.to_datetime(texto[br], format='%d/%m/%Y', errors='coerce')
+
+    resto = ~(vazios | iso | br)
+    if resto.any():
+        iso_com_hora = resto & texto.str.match(r'^\d{4}-\d{1,2}-\d{1,2}')
+        if iso_com_hora.any():
+            datas[iso_com_hora] = pd.to_datetime(texto[iso_com_hora], format='ISO8601', errors='coerce')
+        outros = resto & ~iso_com_hora
+        if outros.any():
+            datas[outros] = pd.to_datetime(texto[outros], format='mixed', dayfirst=True, errors='coerce')
+
+    invalidos = texto[~vazios & datas.isna()].tolist()
+    return pd.Series(datas.to_numpy()[codigos], index=series.index, name=series.name), invalidos
+
+
+def converter_data_robusta(series):
+    """Só as datas de analisar_datas (NaT para vazios e ilegíveis)."""
+    return analisar_datas(series)[0]
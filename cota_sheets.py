@@ -0,0 +1,203 @@
+# ==============================================================================
+# LIMITE DE COTA DA API DO GOOGLE SHEETS
+# ==============================================================================
+# Todas as chamadas do gspread passam por ClienteHTTPComCota.request (leituras,
+# escritas, find, append_row, worksheet()...). Antes de cada chamada um token é
+# retirado do balde correspondente (leitura = GET, escrita = demais métodos);
+# erros 429/5xx são repetidos com backoff exponencial com jitter.
+# Cada chamada e retentativa também é contada no perfil da ação (perfil_acoes).
+# O limitador vive no módulo, então é único por processo e sobrevive aos reruns
+# do Streamlit. O uso por ação (medir_uso_cota) não sai dos totais do processo:
+# cada thread guarda a pilha das medições abertas e cada chamada conta só nelas,
+# então duas ações simultâneas não misturam seus números. Workers de um pool
+# entram na medição de quem os criou via perfil_acoes.propagar.
+import random
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from functools import wraps
+
+import requests
+from gspread.exceptions import APIError
+from gspread.http_client import HTTPClient
+
+import perfil_acoes
+
+COTA_LEITURAS_POR_MINUTO = 60 # Cota por usuário (a service account é um usuário)
+COTA_ESCRITAS_POR_MINUTO = 60
+MAX_TENTATIVAS = 6
+BACKOFF_BASE = 1.0 # segundos
+BACKOFF_TETO = 32.0 # segundos
+CODIGOS_REPETIVEIS = {429, 500, 502, 503, 504}
+
+
+class BaldeDeTokens:
+    """Token bucket: 'capacidade' tokens, reabastecidos linearmente em 60 s."""
+
+    def __init__(self, por_minuto):
+        self.capacidade = float(por_minuto)
+        self.taxa = por_minuto / 60.0
+        self.tokens = float(por_minuto)
+        self.atualizado_em = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _reabastecer(self):
+        agora = time.monotonic()
+        self.tokens = min(self.capacidade, self.tokens + (agora - self.atualizado_em) * self.taxa)
+        self.atualizado_em = agora
+
+    def retirar(self):
+        """Bloqueia até haver um token. Retorna quantos segundos esperou."""
+        esperado = 0.0
+        while True:
+            with self.lock:
+                self._reabastecer()
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return esperado
+                espera = (1 - self.tokens) / self.taxa
+            time.sleep(espera)
+            esperado += espera
+
+    def disponiveis(self):
+        with self.lock:
+            self._reabastecer()
+            return int(self.tokens)
+
+
+_contexto = threading.local()
+
+
+def _medicoes():
+    if not hasattr(_contexto, "medicoes"): _contexto.medicoes = []
+    return _contexto.medicoes
+
+
+class MedicaoCota:
+    """
+    Contadores de uso de cota com o pico por minuto: os totais do processo (LimitadorCota.total)
+    ou uma ação (só as chamadas feitas nas threads dela).
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.contadores = {"leituras": 0, "escritas": 0, "esperas": 0, "segundos_espera": 0.0,
+                           "retentativas": 0, "erros": 0}
+        self.janela = {"leitura": deque(), "escrita": deque()}
+        self.picos = {"leitura": 0, "escrita": 0}
+
+    def contar_chamada(self, tipo, espera, agora):
+        with self.lock:
+            self.contadores["leituras" if tipo == "leitura" else "escritas"] += 1
+            if espera > 0:
+                self.contadores["esperas"] += 1
+                self.contadores["segundos_espera"] += espera
+            janela = self.janela[tipo]
+            janela.append(agora)
+            while janela and agora - janela[0] > 60: janela.popleft()
+            self.picos[tipo] = max(self.picos[tipo], len(janela))
+
+    def registrar(self, chave, quantidade=1):
+        with self.lock: self.contadores[chave] += quantidade
+
+
+class LimitadorCota:
+    """
+    Baldes de leitura/escrita + uso para telemetria: 'total' (MedicaoCota do processo inteiro) e
+    'por_acao' (último uso de cada ação, ver medir_uso_cota; leia sob 'lock').
+    """
+
+    def __init__(self, leituras_por_minuto=COTA_LEITURAS_POR_MINUTO, escritas_por_minuto=COTA_ESCRITAS_POR_MINUTO):
+        self.cotas = {"leitura": leituras_por_minuto, "escrita": escritas_por_minuto}
+        self.baldes = {"leitura": BaldeDeTokens(leituras_por_minuto), "escrita": BaldeDeTokens(escritas_por_minuto)}
+        self.total = MedicaoCota()
+        self.lock = threading.Lock()
+        self.por_acao = {}
+
+    def antes_da_chamada(self, tipo):
+        espera = self.baldes[tipo].retirar()
+        agora = time.monotonic()
+        self.total.contar_chamada(tipo, espera, agora)
+        for medicao in _medicoes(): medicao.contar_chamada(tipo, espera, agora)
+
+    def registrar(self, chave, quantidade=1):
+        self.total.registrar(chave, quantidade)
+        for medicao in _medicoes(): medicao.registrar(chave, quantidade)
+
+    def instantaneo(self):
+        with self.total.lock: return dict(self.total.contadores)
+
+    def uso_por_acao(self):
+        """Cópia de por_acao (tirada sob a trava: medir_uso_cota grava de outras threads)."""
+        with self.lock: return {acao: dict(uso) for acao, uso in self.por_acao.items()}
+
+    def disponiveis(self, tipo="leitura"):
+        return self.baldes[tipo].disponiveis()
+
+
+LIMITADOR = LimitadorCota()
+
+
+class ClienteHTTPComCota(HTTPClient):
+    """HTTPClient do gspread com limite de cota e retentativa. Use em gspread.authorize(http_client=...)."""
+
+    def request(self, method, endpoint, *args, **kwargs):
+        tipo = "leitura" if method.upper() == "GET" else "escrita"
+        for tentativa in range(MAX_TENTATIVAS):
+            LIMITADOR.antes_da_chamada(tipo)
+            try:
+                resposta = super().request(method, endpoint, *args, **kwargs)
+                perfil_acoes.registrar_chamada(tipo, len(resposta.content or b''))
+                return resposta
+            except APIError as e:
+                if e.code not in CODIGOS_REPETIVEIS or tentativa == MAX_TENTATIVAS - 1:
+                    LIMITADOR.registrar("erros"); raise
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+                if tentativa == MAX_TENTATIVAS - 1:
+                    LIMITADOR.registrar("erros"); raise
+            LIMITADOR.registrar("retentativas")
+            perfil_acoes.registrar_retentativa()
+            time.sleep(random.uniform(0, min(BACKOFF_TETO, BACKOFF_BASE * 2 ** tentativa)))
+
+
+def propagar(func):
+    """Envolve func para rodar em outra thread contando nas medições abertas agora nesta thread."""
+    medicoes = list(_medicoes())
+    if not medicoes: return func
+
+    @wraps(func)
+    def envolvida(*args, **kwargs):
+        anterior = _medicoes()
+        _contexto.medicoes = list(medicoes)
+        try: return func(*args, **kwargs)
+        finally: _contexto.medicoes = anterior
+    return envolvida
+
+
+@contextmanager
+def medir_uso_cota(acao):
+    """
+    Mede o consumo de cota de um bloco de código e guarda em LIMITADOR.por_acao[acao].
+    Conta só as chamadas desta thread (e dos workers propagados), não as de outras ações.
+    O dict devolvido é preenchido na saída do bloco.
+    """
+    medicao = MedicaoCota()
+    pilha = _medicoes()
+    pilha.append(medicao)
+    inicio = time.perf_counter()
+    uso = {}
+    try:
+        yield uso
+    finally:
+        pilha.remove(medicao)
+        with medicao.lock:
+            uso.update(medicao.contadores)
+            picos = dict(medicao.picos)
+        uso["segundos_espera"] = round(uso["segundos_espera"], 2)
+        uso["duracao_s"] = round(time.perf_counter() - inicio, 2)
+        uso["pico_leituras_min"] = picos["leitura"]
+        uso["pico_escritas_min"] = picos["escrita"]
+        uso["pct_cota_leitura"] = round(100 * picos["leitura"] / LIMITADOR.cotas["leitura"])
+        uso["pct_cota_escrita"] = round(100 * picos["escrita"] / LIMITADOR.cotas["escrita"])
+        with LIMITADOR.lock: LIMITADOR.por_acao[acao] = dict(uso)
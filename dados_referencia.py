@@ -0,0 +1,202 @@
+# ==============================================================================
+# DADOS DE REFERÊNCIA (ABAS PEQUENAS DE CONSULTA)
+# ==============================================================================
+# Cache compartilhado (por processo: todas as sessões e ações) de abas pequenas
+# como 'Equipes'. Cada aba é lida uma vez e guardada junto com as estruturas
+# derivadas dela. Depois do TTL a aba é relida; se o fingerprint do conteúdo
+# não mudou, as estruturas derivadas são reaproveitadas.
+# A leitura e o derivar rodam fora da trava do cache (uma trava de carga por aba
+# evita leituras duplicadas), então quem só consulta nunca espera pela API.
+# Falhas de leitura são registradas no log e a última versão boa continua valendo;
+# sem versão boa, a própria falha fica em cache por ttl_falha segundos (sem reler
+# nem relogar); abas das quais o login depende usam um ttl_falha curto.
+# Nada aqui importa o Streamlit.
+import hashlib
+import hmac
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+REFERENCIA_TTL = 300 # segundos até reler a aba (e conferir o fingerprint)
+REFERENCIA_TTL_FALHA = 5 # segundos até tentar de novo uma aba que nunca foi lida (usado pelo login)
+ITERACOES_HASH_SENHA = 10_000 # PBKDF2-SHA256 por senha (custo de ~ms por login)
+
+_lock = threading.Lock()
+_cache = {} # titulo -> {"planilha", "versao", "dados", "carregado_em"} ou {"planilha", "erro", "carregado_em", "ttl"}
+_cargas = {} # titulo -> trava de carga (uma leitura da aba por vez)
+_atualizadores = {} # titulo -> thread de atualização periódica
+
+
+def impressao_digital_valores(valores):
+    """
+    Fingerprint do conteúdo bruto de uma aba (retorno de get_all_values): 'linhas:sha1'.
+    Aceita qualquer iterável de linhas (um gerador é consumido linha a linha).
+    """
+    h = hashlib.sha1(); n = 0
+    for linha in valores:
+        h.update("\x1f".join(map(str, linha)).encode('utf-8'))
+        h.update(b"\x1e")
+        n += 1
+    return f"{n}:{h.hexdigest()}"
+
+
+_SEM_PADRAO = object()
+
+
+def _entrada_valida(planilha, titulo, ttl, forcar):
+    with _lock:
+        entrada = _cache.get(titulo)
+    if entrada is None or entrada["planilha"] is not planilha: return None # outra planilha (benchmark/testes)
+    if forcar or time.time() - entrada["carregado_em"] >= entrada.get("ttl", ttl): return None
+    return entrada
+
+
+def _carregar(planilha, titulo, derivar, ttl_falha):
+    """Lê e deriva a aba fora de _lock; a entrada nova só é trocada no cache no final."""
+    with _lock:
+        anterior = _cache.get(titulo)
+    if anterior is not None and anterior["planilha"] is not planilha: anterior = None
+    try:
+        valores = planilha.worksheet(titulo).get_all_values()
+    except Exception as e:
+        if anterior is None or "erro" in anterior:
+            logger.exception("Falha ao ler a aba de referência '%s'; nova tentativa em %s s", titulo, ttl_falha)
+            entrada = {"planilha": planilha, "erro": e, "carregado_em": time.time(), "ttl": ttl_falha}
+        else:
+            logger.exception("Falha ao reler a aba de referência '%s'; mantendo a versão %s", titulo, anterior["versao"])
+            entrada = dict(anterior, carregado_em=time.time()) # não insiste a cada chamada
+    else:
+        versao = impressao_digital_valores(valores)
+        if anterior is not None and anterior.get("versao") == versao:
+            entrada = dict(anterior, carregado_em=time.time())
+        else:
+            entrada = {"planilha": planilha, "versao": versao, "dados": derivar(valores), "carregado_em": time.time()}
+            logger.info("Aba de referência '%s' carregada (%s)", titulo, versao)
+    with _lock:
+        _cache[titulo] = entrada
+    return entrada
+
+
+def obter_referencia(planilha, titulo, derivar, ttl=REFERENCIA_TTL, forcar=False, padrao=_SEM_PADRAO, ttl_falha=None):
+    """
+    Estruturas derivadas da aba 'titulo': derivar(valores) -> dict, calculado só quando o conteúdo muda.
+    Se a aba nunca foi lida com sucesso, devolve 'padrao' (se dado) ou levanta a exceção da leitura;
+    a falha vale por 'ttl_falha' segundos (padrão: 'ttl'), sem nova chamada à API.
+    """
+    entrada = _entrada_valida(planilha, titulo, ttl, forcar)
+    if entrada is None:
+        with _lock:
+            carga = _cargas.setdefault(titulo, threading.Lock())
+        with carga:
+            # Outra thread pode ter acabado de carregar enquanto esta esperava
+            entrada = _entrada_valida(planilha, titulo, ttl, False) if not forcar else None
+            if entrada is None: entrada = _carregar(planilha, titulo, derivar, ttl if ttl_falha is None else ttl_falha)
+    if "erro" in entrada:
+        if padrao is _SEM_PADRAO: raise entrada["erro"]
+        return padrao
+    return entrada["dados"]
+
+
+def referencia_em_cache(titulo):
+    """Estruturas já carregadas de 'titulo' (sem chamar a API, mesmo vencidas) ou None."""
+    with _lock:
+        entrada = _cache.get(titulo)
+        return entrada.get("dados") if entrada is not None else None
+
+
+def manter_atualizada(titulo, obter_planilha, derivar, intervalo=REFERENCIA_TTL, ttl_falha=None):
+    """
+    Inicia (uma vez por processo) uma thread que relê 'titulo' a cada 'intervalo' segundos,
+    para que quem consulta com referencia_em_cache nunca espere pela API.
+    obter_planilha: função sem argumentos que devolve a planilha atual.
+    ttl_falha: como em obter_referencia (uma falha da thread não trava quem consulta por mais tempo).
+    """
+    def _laco():
+        while True:
+            time.sleep(intervalo)
+            try:
+                planilha = obter_planilha()
+                if planilha is not None:
+                    obter_referencia(planilha, titulo, derivar, ttl=intervalo, forcar=True, ttl_falha=ttl_falha)
+            except Exception:
+                logger.exception("Atualização em segundo plano da aba '%s' falhou", titulo)
+
+    with _lock:
+        if titulo in _atualizadores: return
+        _atualizadores[titulo] = threading.Thread(target=_laco, name=f"referencia-{titulo}", daemon=True)
+        _atualizadores[titulo].start()
+
+
+def invalidar_referencia(titulo=None):
+    """Força a releitura na próxima consulta (de uma aba ou de todas)."""
+    with _lock:
+        for t, entrada in _cache.items():
+            if titulo is None or t == titulo: entrada["carregado_em"] = 0.0
+
+
+# ------------------------------------------------------------------------------
+# Equipes
+# ------------------------------------------------------------------------------
+def derivar_equipes(valores):
+    """
+    A partir da aba 'Equipes' (colunas Nome, Posição e, se houver, Equipe):
+    - lideres: nomes com Posição 'Lider' (são colunas da origem que não vão para as abas derivadas);
+    - posicao_por_nome: {nome: posição};
+    - equipes: {equipe: [nomes]} (vazio se a aba não tem a coluna 'Equipe').
+    """
+    cabecalho = [str(c).strip() for c in valores[0]] if valores else []
+    registros = [dict(zip(cabecalho, linha)) for linha in valores[1:]]
+    if registros and not {'Nome', 'Posição'} <= set(cabecalho):
+        logger.warning("Aba de equipes sem as colunas 'Nome'/'Posição' (cabeçalho: %s)", cabecalho)
+    posicao_por_nome = {}; equipes = {}
+    for r in registros:
+        nome = str(r.get('Nome', '')).strip()
+        if not nome: continue
+        posicao_por_nome[nome] = str(r.get('Posição', '')).strip()
+        equipe = str(r.get('Equipe', '')).strip()
+        if equipe: equipes.setdefault(equipe, []).append(nome)
+    lideres = tuple(n for n, p in posicao_por_nome.items() if p == 'Lider')
+    return {"lideres": lideres, "posicao_por_nome": posicao_por_nome, "equipes": equipes}
+
+
+# ------------------------------------------------------------------------------
+# Senhas
+# ------------------------------------------------------------------------------
+def _hash_senha(senha, sal):
+    return hashlib.pbkdf2_hmac('sha256', senha.encode('utf-8'), sal, ITERACOES_HASH_SENHA)
+
+
+def derivar_senhas(valores):
+    """
+    Índice de credenciais da aba 'Senhas' (colunas Usuario, Senha e opcionalmente Status):
+    {usuario: [(sal, hash da senha, status), ...]}. As senhas em texto não ficam guardadas.
+    Sem coluna 'Status', o papel é 'Visualizador'.
+    """
+    cabecalho = [str(c).strip() for c in valores[0]] if valores else []
+    if valores and not {'Usuario', 'Senha'} <= set(cabecalho):
+        logger.warning("Aba de senhas sem as colunas 'Usuario'/'Senha' (cabeçalho: %s)", cabecalho)
+    indice = {}
+    for linha in valores[1:]:
+        r = dict(zip(cabecalho, linha))
+        usuario = str(r.get('Usuario', '')).strip()
+        if not usuario: continue
+        sal = os.urandom(16)
+        status = r['Status'] if 'Status' in cabecalho else 'Visualizador'
+        indice.setdefault(usuario, []).append((sal, _hash_senha(str(r.get('Senha', '')).strip(), sal), status))
+    return indice
+
+
+_SAL_FICTICIO = os.urandom(16)
+
+
+def conferir_credenciais(indice, usuario, senha):
+    """Status do usuário se a senha confere, senão None. Usuário inexistente custa o mesmo hash."""
+    usuario = str(usuario).strip(); senha = str(senha).strip()
+    candidatos = indice.get(usuario) or [(_SAL_FICTICIO, b'', None)]
+    status = None
+    for sal, esperado, papel in candidatos:
+        if hmac.compare_digest(_hash_senha(senha, sal), esperado) and status is None: status = papel
+    return status
@@ -0,0 +1,247 @@
+# ==============================================================================
+# ESPELHO LOCAL (SQLite) DAS ABAS DA PLANILHA
+# ==============================================================================
+# Cópia local das abas de mês, do Backlog e da aba consolidada, atualizada pelas
+# ações de sincronização. A tela de visualização lê daqui: filtros e busca por ID
+# rodam no SQLite (com índices) e não gastam cota do Sheets, inclusive quando o
+# Google está lento ou fora do ar.
+import hashlib
+import os
+import sqlite3
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+
+import pandas as pd
+
+ESPELHO_CAMINHO = os.environ.get("ESPELHO_PLANILHA_SQLITE", "espelho_planilha.sqlite")
+COLUNAS_INDEXADAS = ("ID", "Encarregado", "Fonte_Dados")
+
+# Gravações feitas por este processo, por aba: quem guarda cópias em memória (visao_aba)
+# percebe a mudança sem consultar o SQLite. Gravações de outros processos (CLI) só pela 'versao'.
+_geracoes = {}
+
+
+def _conectar():
+    con = sqlite3.connect(ESPELHO_CAMINHO, timeout=30)
+    con.execute("PRAGMA journal_mode=WAL")
+    con.execute("CREATE TABLE IF NOT EXISTS _abas (aba TEXT PRIMARY KEY, tabela TEXT, linhas INTEGER, atualizado_em TEXT, "
+                "versao INTEGER DEFAULT 0)")
+    try: con.execute("ALTER TABLE _abas ADD COLUMN versao INTEGER DEFAULT 0") # espelhos criados antes da coluna
+    except sqlite3.OperationalError: pass
+    return con
+
+
+@contextmanager
+def _conexao():
+    con = _conectar()
+    try:
+        with con: yield con # commit ao sair (rollback em erro)
+    finally: con.close()
+
+
+def _q(nome):
+    return '"' + str(nome).replace('"', '""') + '"'
+
+
+def _nome_tabela(aba):
+    return "aba_" + hashlib.sha1(aba.encode('utf-8')).hexdigest()[:12]
+
+
+def _tabela(con, aba):
+    linha = con.execute("SELECT tabela FROM _abas WHERE aba = ?", (aba,)).fetchone()
+    return linha[0] if linha else None
+
+
+def _criar_indices(con, tabela, colunas):
+    for col in COLUNAS_INDEXADAS:
+        if col in colunas:
+            con.execute(f"CREATE INDEX {_q('ix_' + uuid.uuid4().hex)} ON {_q(tabela)} ({_q(col)})")
+
+
+def _como_texto(df):
+    """Tudo como texto ('' para nulos). Funciona também com colunas 'category' (onde fillna('') falha)."""
+    return df.apply(lambda s: s.astype(str).where(s.notna(), ''))
+
+
+def _registrar(con, aba, tabela):
+    linhas = con.execute(f"SELECT COUNT(*) FROM {_q(tabela)}").fetchone()[0]
+    versao = con.execute("SELECT COALESCE(MAX(versao), 0) + 1 FROM _abas WHERE aba = ?", (aba,)).fetchone()[0]
+    con.execute("INSERT OR REPLACE INTO _abas (aba, tabela, linhas, atualizado_em, versao) VALUES (?, ?, ?, ?, ?)",
+                (aba, tabela, linhas, datetime.now().strftime('%d/%m/%Y %H:%M:%S'), versao))
+
+
+def _gravada(aba):
+    """Chamar depois do commit de uma gravação de 'aba'."""
+    _geracoes[aba] = _geracoes.get(aba, 0) + 1
+
+
+def geracao_local(aba):
+    """Contador de gravações de 'aba' feitas por este processo (sem I/O)."""
+    return _geracoes.get(aba, 0)
+
+
+def _tabela_temporaria(con, colunas):
+    """Tabela TEMP (some quando a conexão fecha) com 'colunas' em texto, para gravações em partes."""
+    nome = "partes_" + uuid.uuid4().hex[:8]
+    con.execute(f"CREATE TEMP TABLE {_q(nome)} ({', '.join(_q(c) + ' TEXT' for c in colunas)})")
+    return nome
+
+
+def _anexar(con, tabela, colunas, df):
+    """Acrescenta df (reordenado para 'colunas', tudo como texto) em 'tabela', numa transação curta."""
+    linhas = _como_texto(df.reindex(columns=colunas, fill_value='')).itertuples(index=False, name=None)
+    with con: con.executemany(f"INSERT INTO {_q(tabela)} VALUES ({','.join('?' * len(colunas))})", linhas)
+
+
+def _consumir(partes, gravar):
+    """
+    Passa cada parte para gravar(parte) até a primeira falha do espelho; daí em diante só consome o resto.
+    Erros do próprio gerador de partes sobem (o espelho nunca deve esconder a falha de quem o alimenta).
+    """
+    ok = True
+    for parte in partes:
+        if not ok: continue
+        try: gravar(parte)
+        except Exception: ok = False
+    return ok
+
+
+def gravar_aba(aba, df):
+    """
+    Substitui o espelho de 'aba' pelo conteúdo de df (tudo como texto).
+    A troca é atômica: quem estiver lendo vê a versão antiga ou a nova, nunca vazio.
+    Retorna False se não foi possível gravar (o espelho nunca deve derrubar a sincronização).
+    """
+    return gravar_aba_em_partes(aba, list(df.columns), [df])
+
+
+def gravar_aba_em_partes(aba, colunas, partes):
+    """
+    Como gravar_aba, com o conteúdo chegando em partes (DataFrames; colunas fora de 'colunas' são
+    descartadas e as que faltam ficam vazias), ex.: um gerador que produz um mês por vez.
+    As partes vão para uma tabela TEMP, uma transação curta por parte, e a troca é uma transação só
+    no final. 'partes' é consumido até o fim mesmo que o espelho falhe; erros do próprio gerador sobem.
+    """
+    con = temporaria = None
+    try:
+        try:
+            con = _conectar()
+            temporaria = _tabela_temporaria(con, colunas)
+        except Exception: pass # sem espelho: as partes ainda são consumidas (e _anexar falha)
+        if not _consumir(partes, lambda df: _anexar(con, temporaria, colunas, df)): return False
+        try:
+            tabela = _nome_tabela(aba)
+            nova = f"{tabela}_{uuid.uuid4().hex[:8]}"
+            with con:
+                con.execute(f"CREATE TABLE {_q(nova)} AS SELECT * FROM {_q(temporaria)}")
+                _criar_indices(con, nova, colunas)
+                con.execute(f"DROP TABLE IF EXISTS {_q(tabela)}")
+                con.execute(f"ALTER TABLE {_q(nova)} RENAME TO {_q(tabela)}")
+                _registrar(con, aba, tabela)
+        except Exception:
+            return False
+        _gravada(aba)
+        return True
+    finally:
+        if con is not None: con.close()
+
+
+def substituir_blocos(aba, coluna, blocos, remover=()):
+    """
+    Atualização parcial: cada (valor, df) de 'blocos' (pode ser um gerador) troca as linhas com
+    coluna == valor; linhas com coluna em 'remover' são apagadas. 'remover' só é lido depois de
+    consumidos os blocos. Os blocos vão para uma tabela TEMP e a troca é uma transação só, no final.
+    Retorna False se o espelho não tem a aba ou as colunas não batem (nesse caso use gravar_aba);
+    'blocos' é consumido até o fim mesmo nesses casos; erros do próprio gerador sobem.
+    """
+    con = temporaria = colunas = None; valores = []
+    try:
+        try:
+            con = _conectar()
+            tabela = _tabela(con, aba)
+            colunas = [r[1] for r in con.execute(f"PRAGMA table_info({_q(tabela)})")] if tabela else None
+            if tabela is not None: temporaria = _tabela_temporaria(con, colunas)
+        except Exception: pass
+
+        def _gravar(bloco):
+            valor, df = bloco
+            if list(df.columns) != colunas: raise ValueError(f"colunas de '{valor}' não batem com o espelho")
+            _anexar(con, temporaria, colunas, df)
+            valores.append(valor)
+
+        if not _consumir(blocos, _gravar) or temporaria is None: return False
+        valores += list(remover)
+        try:
+            with con:
+                if valores:
+                    con.execute(f"DELETE FROM {_q(tabela)} WHERE {_q(coluna)} IN ({','.join('?' * len(valores))})", valores)
+                con.execute(f"INSERT INTO {_q(tabela)} SELECT * FROM {_q(temporaria)}")
+                _registrar(con, aba, tabela)
+        except Exception:
+            return False
+        _gravada(aba)
+        return True
+    finally:
+        if con is not None: con.close()
+
+
+def remover_ids(aba, ids):
+    try:
+        with _conexao() as con:
+            tabela = _tabela(con, aba)
+            if tabela is None: return 0
+            ids = list(ids)
+            cur = con.execute(f"DELETE FROM {_q(tabela)} WHERE \"ID\" IN ({','.join('?' * len(ids))})", ids)
+            _registrar(con, aba, tabela)
+        _gravada(aba)
+        return cur.rowcount
+    except Exception:
+        return 0
+
+
+def info_aba(aba):
+    """{'linhas': int, 'atualizado_em': str, 'versao': int} ou None se a aba ainda não foi espelhada."""
+    try:
+        with _conexao() as con:
+            linha = con.execute("SELECT linhas, atualizado_em, versao FROM _abas WHERE aba = ?", (aba,)).fetchone()
+    except Exception:
+        return None
+    return {"linhas": linha[0], "atualizado_em": linha[1], "versao": linha[2] or 0} if linha else None
+
+
+def colunas_aba(aba):
+    """Colunas do espelho de 'aba', na ordem, ou None se a aba ainda não foi espelhada."""
+    try:
+        with _conexao() as con:
+            tabela = _tabela(con, aba)
+            return [r[1] for r in con.execute(f"PRAGMA table_info({_q(tabela)})")] if tabela else None
+    except Exception:
+        return None
+
+
+def ler_aba(aba, encarregados=None, busca_id=None):
+    """Lê o espelho de 'aba' já filtrado (busca_id tem prioridade sobre encarregados). None se não espelhada."""
+    with _conexao() as con:
+        tabela = _tabela(con, aba)
+        if tabela is None: return None
+        colunas = {r[1] for r in con.execute(f"PRAGMA table_info({_q(tabela)})")}
+        sql = f"SELECT * FROM {_q(tabela)}"
+        params = []
+        if busca_id and "ID" in colunas:
+            sql += ' WHERE "ID" = ?'; params = [busca_id]
+        elif encarregados and "Encarregado" in colunas:
+            sql += f' WHERE "Encarregado" IN ({",".join("?" * len(encarregados))})'; params = list(encarregados)
+        return pd.read_sql_query(sql + " ORDER BY rowid", con, params=params)
+
+
+def listar_valores(aba, coluna):
+    """Valores distintos (ordenados) de uma coluna do espelho, para montar filtros."""
+    try:
+        with _conexao() as con:
+            tabela = _tabela(con, aba)
+            if tabela is None: return []
+            if coluna not in {r[1] for r in con.execute(f"PRAGMA table_info({_q(tabela)})")}: return []
+            return [r[0] for r in con.execute(f"SELECT DISTINCT {_q(coluna)} FROM {_q(tabela)} ORDER BY 1")]
+    except Exception:
+        return []
@@ -0,0 +1,1566 @@
+# ==============================================================================
+# MOTOR DA PLANILHA (SEM STREAMLIT)
+# ==============================================================================
+# Toda a lógica de dados do gerenciador: leitura e limpeza das abas, escrita em
+# lotes, índice de IDs e as ações (sincronizar mês, backlog, consolidar,
+# histórico, deletar). Usado pela tela (gerenciador_planilha.py), pelo CLI
+# (cli_planilha.py), pelo benchmark e pela conciliação (conciliacao.py).
+# Importar este módulo não importa o Streamlit nem as bibliotecas pesadas:
+# pandas, numpy, gspread e os módulos que dependem deles só são carregados no
+# primeiro uso, para que jobs curtos do cron subam rápido.
+import hashlib
+import importlib
+import itertools
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack, contextmanager
+from datetime import datetime, timedelta
+from perfil_acoes import contar_celulas, etapa, medido, propagar
+from dados_referencia import (REFERENCIA_TTL_FALHA, conferir_credenciais, derivar_equipes, derivar_senhas,
+                              impressao_digital_valores, manter_atualizada, obter_referencia, referencia_em_cache)
+from tarefas_fundo import reportar
+
+logger = logging.getLogger(__name__)
+
+
+class _ImportacaoPreguicosa:
+    """Módulo importado no primeiro acesso a um atributo."""
+
+    def __init__(self, nome):
+        self._nome = nome
+        self._modulo = None
+
+    def __getattr__(self, atributo):
+        if self._modulo is None: self._modulo = importlib.import_module(self._nome)
+        return getattr(self._modulo, atributo)
+
+
+pd = _ImportacaoPreguicosa("pandas")
+np = _ImportacaoPreguicosa("numpy")
+gspread = _ImportacaoPreguicosa("gspread")
+armazenamento = _ImportacaoPreguicosa("armazenamento")
+conversao_datas = _ImportacaoPreguicosa("conversao_datas")
+cota_sheets = _ImportacaoPreguicosa("cota_sheets")
+espelho_local = _ImportacaoPreguicosa("espelho_local")
+
+# ==============================================================================
+# CONSTANTES
+# ==============================================================================
+PLANILHA_ORIGEM_NOME = "Total BaseCamp Consolidado" # Origem dos dados brutos
+PLANILHA_CONSOLIDADA_NOME = "Total BaseCamp para Notas" # Destino da consolidação (Dashboard)
+PLANILHA_BACKLOG_NOME = "Backlog"
+PLANILHA_EQUIPES_NOME = "Equipes"
+PLANILHA_SENHAS_NOME = "Senhas"
+PLANILHA_HISTORICO_NOME = "HistoricoDiario"
+PLANILHA_META_CONSOLIDACAO_NOME = "ConsolidacaoMeta" # Fingerprints por mês da última consolidação
+CABECALHO_HISTORICO = ["Data", "Total_Fechadas", "Total_Tarefas"]
+DIAS_HISTORICO_POR_SEMANA = 5 # dias preenchidos em cada semana (seg-sex); o dia de hoje é sempre gravado
+
+MESES_PT_NUM = {
+    'janeiro': 1, 'fevereiro': 2, 'março': 3, 'abril': 4, 'maio': 5, 'junho': 6,
+    'julho': 7, 'agosto': 8, 'setembro': 9, 'outubro': 10, 'novembro': 11, 'dezembro': 12
+}
+MESES_NUM_PT = {v: k.capitalize() for k, v in MESES_PT_NUM.items()}
+
+ABAS_POR_LOTE = 10 # Abas por chamada values_batch_get
+ABAS_POR_JANELA = 4 # Abas por values_batch_get na consolidação em fluxo (memória: ~LEITORES_PARALELOS + 1 janelas)
+LEITORES_PARALELOS = 4 # chamadas de leitura simultâneas (também limitadas pelos tokens de leitura livres)
+
+CABECALHO_TTL = 600 # segundos até reler a linha 1 de uma aba na leitura projetada (ver ler_colunas_em_lote)
+
+# Snapshot compartilhado da aba de origem (ver obter_snapshot_origem)
+SNAPSHOT_ORIGEM_TTL = 300 # segundos até a próxima leitura da origem
+# Colunas internas derivadas da 'Lista' (ver classificar_lista). Nunca são gravadas na planilha.
+COL_ARQUIVADA = "_Arquivada" # True para listas [ARCHIVED]
+COL_BACKLOG = "_Backlog" # True para listas de Backlog
+COL_SEMANA_INICIO = "_Semana_Inicio" # Segunda-feira da semana citada no nome da lista (datetime64)
+COL_DATA_FINAL = "_Data_Final" # 'Data Final' já convertida (datetime64), calculada uma vez por snapshot
+COLUNAS_INTERNAS = [COL_ARQUIVADA, COL_BACKLOG, COL_SEMANA_INICIO, COL_DATA_FINAL]
+
+# Memória dos DataFrames grandes (ver compactar_tipos / iterar_linhas)
+COLUNAS_CATEGORICAS = ['Encarregado', 'Lista', 'Fonte_Dados'] # poucos valores distintos => 'category'
+LINHAS_POR_BLOCO_SERIALIZACAO = 5000 # linhas convertidas para texto por vez
+
+# Escrita em lotes (ver escrever_dados_em_lotes)
+CELULAS_POR_LOTE_ESCRITA = 50_000 # teto de células por requisição de valores (~1 MB de payload)
+ESCRITORES_PARALELOS = 3 # requisições de escrita simultâneas (o limitador de cota continua valendo)
+ESCRITA_RETOMADA_TTL = 600 # segundos em que uma escrita em lotes que falhou pode ser retomada
+
+# Leituras de faixas em lote (ver _ler_faixas_em_lote)
+FAIXAS_POR_LEITURA = 100 # ranges por chamada values_batch_get (limite de tamanho da URL)
+
+# ==============================================================================
+# FUNÇÕES AUXILIARES
+# ==============================================================================
+def obter_nome_aba_mes_atual():
+    hoje = datetime.now()
+    return f"{MESES_NUM_PT[hoje.month]} {hoje.year}"
+
+def extrair_mes_ano_da_aba(nome_aba):
+    try:
+        partes = nome_aba.split()
+        if len(partes) == 2:
+            mes_nome = partes[0].lower()
+            ano_str = partes[1]
+            if mes_nome in MESES_PT_NUM and ano_str.isdigit() and len(ano_str) == 4:
+                return MESES_PT_NUM[mes_nome], int(ano_str)
+    except: pass
+    return None
+
+def obter_equipes(spreadsheet):
+    """Estruturas da aba 'Equipes' (lideres, posicao_por_nome, equipes), do cache de referência compartilhado."""
+    return obter_referencia(spreadsheet, PLANILHA_EQUIPES_NOME, derivar_equipes)
+
+def obter_lista_colunas_para_remover(spreadsheet):
+    cols_to_drop = ['Peso'] 
+    # Sem a aba 'Equipes' as colunas de líderes ficam (a falha já foi logada pelo cache de referência)
+    equipes = obter_referencia(spreadsheet, PLANILHA_EQUIPES_NOME, derivar_equipes, padrao=None)
+    if equipes is not None: cols_to_drop.extend(equipes["lideres"])
+    return cols_to_drop
+
+def regenerar_id_pelo_link(df):
+    if df.empty: return df
+    df.columns = df.columns.astype(str).str.strip()
+    if 'Link' in df.columns:
+        df['ID'] = df['Link'].astype(str).str.split('/').str[-1].str.strip()
+        df = df[df['ID'] != '']
+    return df
+
+def _semana_da_lista(datas_no_nome):
+    """Entre as datas dd/mm/aaaa do nome da lista, a primeira segunda-feira (ou a segunda-feira da primeira data)."""
+    datas = [d for d in pd.to_datetime(pd.Series(datas_no_nome, dtype=object), format='%d/%m/%Y', errors='coerce') if pd.notna(d)]
+    if not datas: return pd.NaT
+    segundas = [d for d in datas if d.dayofweek == 0]
+    return segundas[0] if segundas else datas[0] - timedelta(days=datas[0].dayofweek)
+
+def classificar_lista(df):
+    """
+    Classifica a coluna 'Lista' uma única vez, olhando só os valores distintos:
+    '_Arquivada', '_Backlog' (bool) e '_Semana_Inicio' (datetime64, NaT se o nome não cita data).
+    As ações filtram por essas colunas em vez de varrer as strings de novo.
+    """
+    if 'Lista' not in df.columns:
+        df[COL_ARQUIVADA] = False; df[COL_BACKLOG] = False; df[COL_SEMANA_INICIO] = pd.NaT
+        return df
+    codigos, unicos = pd.factorize(df['Lista'], use_na_sentinel=False)
+    unicos = pd.Series(np.asarray(unicos, dtype=object)).fillna('').astype(str)
+    arquivada = unicos.str.contains(r"\[ARCHIVED\]", case=False, regex=True).to_numpy(dtype=bool)
+    backlog = unicos.str.contains("Backlog", case=False, regex=False).to_numpy(dtype=bool)
+    semana = pd.to_datetime(pd.Series([_semana_da_lista(d) for d in unicos.str.findall(r"\d{2}/\d{2}/\d{4}")], dtype=object)).to_numpy()
+    df[COL_ARQUIVADA] = arquivada[codigos]
+    df[COL_BACKLOG] = backlog[codigos]
+    df[COL_SEMANA_INICIO] = semana[codigos]
+    return df
+
+def remover_colunas_internas(df):
+    return df.drop(columns=[c for c in COLUNAS_INTERNAS if c in df.columns])
+
+def compactar_tipos(df):
+    """
+    Reduz a memória de um DataFrame grande (origem ou bloco de mês), in-place:
+    - colunas de baixa cardinalidade (COLUNAS_CATEGORICAS) viram 'category';
+    - IDs em colunas object são internados (a mesma string é compartilhada entre linhas/blocos).
+    As datas já ficam em datetime64 ('_Data_Final', '_Semana_Inicio').
+    Obs.: fillna('') em coluna 'category' falha; para gerar texto use iterar_linhas/valores_do_dataframe.
+    """
+    for col in COLUNAS_CATEGORICAS:
+        if col in df.columns and not isinstance(df[col].dtype, pd.CategoricalDtype):
+            df[col] = df[col].astype('category')
+    if 'ID' in df.columns and df['ID'].dtype == object:
+        codigos, unicos = pd.factorize(df['ID'])
+        unicos = np.array([sys.intern(u) if isinstance(u, str) else u for u in unicos], dtype=object)
+        df['ID'] = np.append(unicos, None)[codigos]
+    return df
+
+# ==============================================================================
+# CONEXÃO E CACHE
+# ==============================================================================
+# Segredos, em ordem de prioridade: definir_segredos() (o app Streamlit repassa
+# st.secrets), variáveis de ambiente (GCP_SERVICE_ACCOUNT_JSON, SHEET_URL),
+# .streamlit/secrets.toml e, para a conta de serviço, google_credentials.json.
+CONEXAO_TTL = 600 # segundos até reautorizar o cliente e reabrir a planilha
+ARQUIVO_SEGREDOS = os.path.join(".streamlit", "secrets.toml")
+ARQUIVO_CREDENCIAIS = "google_credentials.json"
+_segredos = None
+_conexao = {"lock": threading.Lock(), "cliente": None, "planilhas": {}, "criado_em": 0.0}
+
+def definir_segredos(segredos):
+    """Usa estes segredos (mapeamento no formato do secrets.toml) em vez de ambiente/arquivos."""
+    global _segredos
+    if segredos == _segredos: return
+    _segredos = segredos
+    with _conexao["lock"]: _conexao["criado_em"] = 0.0 # reautoriza com as credenciais novas
+
+def _ler_segredos():
+    if _segredos is not None: return _segredos
+    segredos = {}
+    if os.path.exists(ARQUIVO_SEGREDOS):
+        try:
+            import tomllib
+            with open(ARQUIVO_SEGREDOS, 'rb') as f: segredos = tomllib.load(f)
+        except Exception: logger.exception("Falha ao ler %s", ARQUIVO_SEGREDOS)
+    if os.environ.get("GCP_SERVICE_ACCOUNT_JSON"):
+        segredos["gcp_service_account"] = json.loads(os.environ["GCP_SERVICE_ACCOUNT_JSON"])
+    if os.environ.get("SHEET_URL"): segredos["SHEET_URL"] = os.environ["SHEET_URL"]
+    return segredos
+
+def autorizar_cliente():
+    with _conexao["lock"]:
+        if _conexao["cliente"] is not None and time.time() - _conexao["criado_em"] < CONEXAO_TTL:
+            return _conexao["cliente"]
+        from google.oauth2.service_account import Credentials
+        scopes = ["https://www.googleapis.com/auth/spreadsheets"]
+        info = _ler_segredos().get("gcp_service_account")
+        try:
+            if info: creds = Credentials.from_service_account_info(dict(info), scopes=scopes)
+            else: creds = Credentials.from_service_account_file(ARQUIVO_CREDENCIAIS, scopes=scopes)
+        except Exception:
+            logger.exception("Credenciais da conta de serviço indisponíveis")
+            return None
+        # Todas as chamadas passam pelo limitador de cota (token bucket + backoff em 429/5xx)
+        _conexao.update(cliente=gspread.authorize(creds, http_client=cota_sheets.ClienteHTTPComCota),
+                        planilhas={}, criado_em=time.time())
+        return _conexao["cliente"]
+
+def abrir_planilha(url=None):
+    """Planilha do Google pela URL (padrão: SHEET_URL dos segredos), em cache. None se falhar (erro no log)."""
+    client = autorizar_cliente()
+    if not client: return None
+    url = url or _ler_segredos().get("SHEET_URL")
+    with _conexao["lock"]:
+        if url in _conexao["planilhas"]: return _conexao["planilhas"][url]
+    try: planilha = client.open_by_url(url)
+    except Exception: logger.exception("Erro ao abrir a planilha"); return None
+    with _conexao["lock"]: _conexao["planilhas"][url] = planilha
+    return planilha
+
+def obter_spreadsheet_cacheada():
+    # Armazenamento alternativo (PlanilhaMemoria do benchmark/testes) tem prioridade sobre o Google
+    planilha = armazenamento.planilha_configurada()
+    if planilha is not None: return planilha
+    return abrir_planilha()
+
+def colunas_de_cabecalho(headers):
+    """Renomeia cabeçalhos duplicados: ['X', 'X'] -> ['X', 'X.1']."""
+    cols = pd.Series(headers)
+    for dup in cols[cols.duplicated()].unique():
+        cols[cols[cols == dup].index.values.tolist()] = [dup + '.' + str(i) if i != 0 else dup for i in range(sum(cols == dup))]
+    return cols
+
+def dataframe_de_valores(all_values):
+    """Monta o DataFrame a partir do retorno de get_all_values (trata cabeçalhos duplicados e regenera o ID)."""
+    if not all_values: return pd.DataFrame()
+    headers = all_values[0]; data = all_values[1:]
+    cols = colunas_de_cabecalho(headers)
+    df = pd.DataFrame(data, columns=cols)
+    df = regenerar_id_pelo_link(df)
+    return df
+
+def ler_valores_aba(worksheet):
+    """get_all_values (retentativas ficam a cargo do limitador de cota). Retorna None em caso de falha."""
+    try: return worksheet.get_all_values()
+    except: return None
+
+def carregar_aba_robusta(worksheet):
+    with etapa(f"carregar_aba_robusta '{worksheet.title}'") as medicao:
+        all_values = ler_valores_aba(worksheet)
+        if not all_values: return pd.DataFrame()
+        medicao.celulas = contar_celulas(all_values); medicao.linhas_entrada = len(all_values) - 1
+        df = dataframe_de_valores(all_values)
+        medicao.linhas_saida = len(df)
+        return df
+
+def ler_valores_em_lote(spreadsheet, titulos, abas_por_lote=ABAS_POR_LOTE, levantar=False):
+    """
+    Lê várias abas inteiras com values_batch_get (uma chamada a cada 'abas_por_lote' abas).
+    Retorna {titulo: valores} com as linhas completadas como em get_all_values.
+    Falhas de leitura vão para o log e as abas do lote ficam de fora do dicionário;
+    com levantar=True a exceção da API sobe para quem chamou.
+    """
+    resultado = {}
+    for i in range(0, len(titulos), abas_por_lote):
+        lote = titulos[i:i + abas_por_lote]
+        ranges = [gspread.utils.absolute_range_name(t) for t in lote]
+        with etapa(f"values_batch_get ({len(lote)} abas)") as medicao:
+            try: resposta = spreadsheet.values_batch_get(ranges)
+            except Exception:
+                if levantar: raise
+                logger.exception("Falha ao ler as abas %s", lote)
+                continue
+            for titulo, value_range in zip(lote, resposta.get('valueRanges', [])):
+                resultado[titulo] = gspread.utils.fill_gaps(value_range.get('values', []))
+                medicao.somar(celulas=contar_celulas(resultado[titulo]), linhas_saida=max(len(resultado[titulo]) - 1, 0))
+    return resultado
+
+def ler_abas_em_paralelo(spreadsheet, titulos, processar=None, abas_por_lote=ABAS_POR_LOTE,
+                         max_leitores=LEITORES_PARALELOS, levantar=False):
+    """
+    Como ler_valores_em_lote, mas com os lotes lidos ao mesmo tempo num pool limitado por
+    max_leitores e pelos tokens de leitura livres. processar(titulo, valores), se dado, roda
+    na thread do lote logo após a leitura (limpeza junto com o download).
+    Retorna {titulo: valores ou processar(...)} na ordem de 'titulos'; falhas de leitura ficam de fora
+    (ou, com levantar=True, a primeira sobe).
+    """
+    if not titulos: return {}
+    leitores = max(1, min(max_leitores, len(titulos), cota_sheets.LIMITADOR.disponiveis("leitura")))
+    # Lotes menores quando há poucos: cada leitor fica com uma chamada (tempo ~ do lote mais lento)
+    por_lote = max(1, min(abas_por_lote, -(-len(titulos) // leitores)))
+    lotes = [titulos[i:i + por_lote] for i in range(0, len(titulos), por_lote)]
+
+    def _ler_lote(lote):
+        valores = ler_valores_em_lote(spreadsheet, lote, por_lote, levantar)
+        return {t: processar(t, v) if processar else v for t, v in valores.items()}
+
+    resultado = {}
+    with etapa(f"ler abas em paralelo ({len(titulos)} abas, {len(lotes)} lotes)"), \
+         ThreadPoolExecutor(max_workers=min(leitores, len(lotes)), thread_name_prefix="leitura") as pool:
+        for parcial in pool.map(propagar(_ler_lote), lotes): resultado.update(parcial)
+    return {t: resultado[t] for t in titulos if t in resultado}
+
+def carregar_abas_em_lote(spreadsheet, titulos, abas_por_lote=ABAS_POR_LOTE):
+    """Versão em lote de carregar_aba_robusta: {titulo: DataFrame}."""
+    return ler_abas_em_paralelo(spreadsheet, titulos, lambda _, v: dataframe_de_valores(v), abas_por_lote)
+
+# ------------------------------------------------------------------------------
+# Leitura projetada: só as colunas pedidas. O cabeçalho de cada aba fica em cache
+# (CABECALHO_TTL) e as colunas viram ranges A1 inteiros ('Aba'!C:C, 'Aba'!E:F),
+# baixados num values_batch_get. Cada range traz a própria linha 1, conferida com
+# o cabeçalho em cache: se as colunas mudaram de lugar, o cabeçalho é relido e a
+# leitura refeita uma vez.
+# ------------------------------------------------------------------------------
+_CABECALHOS = {"lock": threading.Lock(), "abas": {}} # titulo -> (linha 1, lido_em)
+
+def ler_cabecalhos(spreadsheet, titulos, forcar=False):
+    """{titulo: linha 1}. Os que não estão em cache (ou vencidos) saem numa leitura em lote."""
+    agora = time.time()
+    with _CABECALHOS["lock"]:
+        cabecalhos = {t: c for t, (c, lido_em) in _CABECALHOS["abas"].items()
+                      if t in titulos and not forcar and agora - lido_em < CABECALHO_TTL}
+    faltam = [t for t in titulos if t not in cabecalhos]
+    if faltam:
+        lidos = _ler_faixas_em_lote(spreadsheet, [gspread.utils.absolute_range_name(t, '1:1') for t in faltam])
+        with _CABECALHOS["lock"]:
+            for titulo, valores in zip(faltam, lidos):
+                cabecalhos[titulo] = [str(c) for c in valores[0]] if valores else []
+                _CABECALHOS["abas"][titulo] = (cabecalhos[titulo], agora)
+    return {t: cabecalhos[t] for t in titulos}
+
+def ler_colunas_em_lote(spreadsheet, pedidos):
+    """
+    pedidos = {titulo: [colunas]}: lê só essas colunas (e 'Link', de onde sai o ID) de cada aba
+    num único values_batch_get (mais um para os cabeçalhos fora do cache).
+    Retorna {titulo: valores no formato de get_all_values}, com as colunas na ordem da aba e o
+    cabeçalho já desduplicado/sem espaços (como em dataframe_de_valores). Colunas que a aba não tem ficam de fora.
+    """
+    resultado = {}
+    for tentativa in range(2):
+        cabecalhos = ler_cabecalhos(spreadsheet, [t for t in pedidos if t not in resultado], forcar=tentativa > 0)
+        planos = {}; ranges = []
+        for titulo, cabecalho in cabecalhos.items():
+            nomes = [str(c).strip() for c in colunas_de_cabecalho(cabecalho)] if cabecalho else []
+            quer = set(pedidos[titulo]) | {'Link'}
+            indices = [i for i, n in enumerate(nomes) if n in quer]
+            faixas = _intervalos_contiguos(indices)
+            planos[titulo] = (cabecalho, [nomes[i] for i in indices], faixas, len(ranges))
+            ranges += [gspread.utils.absolute_range_name(titulo, f"{_letra_coluna(ini + 1)}:{_letra_coluna(fim + 1)}")
+                       for ini, fim in faixas]
+        with etapa(f"ler colunas ({len(planos)} abas, {len(ranges)} faixas)") as medicao:
+            lidos = _ler_faixas_em_lote(spreadsheet, ranges) if ranges else []
+            medicao.celulas = sum(contar_celulas(v) for v in lidos)
+        mudou = False
+        for titulo, (cabecalho, nomes, faixas, k) in planos.items():
+            blocos = lidos[k:k + len(faixas)]
+            larguras = [fim - ini + 1 for ini, fim in faixas]
+            linha1 = [(list(b[0]) if b else []) + [''] * w for b, w in zip(blocos, larguras)]
+            if any(l[:w] != (cabecalho[ini:fim + 1] + [''] * w)[:w] for l, w, (ini, fim) in zip(linha1, larguras, faixas)):
+                mudou = True; continue # colunas mudaram de lugar: relê o cabeçalho
+            n = max((len(b) for b in blocos), default=1)
+            colunas = [[(list(b[r]) + [''] * w)[:w] if r < len(b) else [''] * w for r in range(1, n)]
+                       for b, w in zip(blocos, larguras)]
+            linhas = colunas[0] if len(colunas) == 1 else [sum(partes, []) for partes in zip(*colunas)]
+            resultado[titulo] = [nomes] + linhas
+            medicao.linhas_saida = (medicao.linhas_saida or 0) + len(linhas)
+        if not mudou: break
+    return resultado
+
+def carregar_aba_projetada(spreadsheet, titulo, colunas):
+    """carregar_aba_robusta só com 'colunas' (+ 'Link' e o ID regenerado). DataFrame vazio se nada foi lido."""
+    valores = ler_colunas_em_lote(spreadsheet, {titulo: colunas}).get(titulo)
+    if not valores: return pd.DataFrame()
+    return dataframe_de_valores(valores)
+
+# ==============================================================================
+# SNAPSHOT DA ORIGEM (compartilhado entre ações e sessões)
+# ==============================================================================
+# Um único objeto por processo: todas as sessões do Streamlit (e as ações do CLI) enxergam o mesmo snapshot.
+_SNAPSHOT_ORIGEM = {"lock": threading.Lock(), "df": None, "versao": None, "carregado_em": 0.0}
+
+def obter_snapshot_origem(spreadsheet, forcar=False):
+    """
+    Retorna (df, versao) da aba 'Total BaseCamp Consolidado' já limpa:
+    colunas sem espaços, ID regenerado pelo Link, classificação da 'Lista' e '_Data_Final' convertida.
+    - Reaproveita o snapshot em memória enquanto estiver dentro do TTL.
+    - Após o TTL (ou forcar=True) baixa a aba de novo; se o fingerprint do conteúdo
+      não mudou, mantém o DataFrame já limpo e só renova o relógio.
+    - Levanta gspread.exceptions.WorksheetNotFound se a aba não existir.
+    O DataFrame retornado é uma cópia rasa: filtre/adicione colunas à vontade, mas não altere valores in-place.
+    """
+    estado = _SNAPSHOT_ORIGEM
+    with estado["lock"]:
+        valido = estado["df"] is not None and (time.time() - estado["carregado_em"]) < SNAPSHOT_ORIGEM_TTL
+        if valido and not forcar:
+            return estado["df"].copy(deep=False), estado["versao"]
+
+        reportar("Lendo a origem")
+        with etapa("ler origem") as medicao:
+            ws_origem = spreadsheet.worksheet(PLANILHA_ORIGEM_NOME)
+            all_values = ler_valores_aba(ws_origem)
+            medicao.celulas = contar_celulas(all_values)
+        if all_values is None:
+            # Falha de leitura: melhor um snapshot antigo do que nenhum
+            if estado["df"] is not None: return estado["df"].copy(deep=False), estado["versao"]
+            return pd.DataFrame(), None
+
+        versao = impressao_digital_valores(all_values)
+        if versao != estado["versao"] or estado["df"] is None:
+            with etapa("limpar origem", linhas_entrada=max(len(all_values) - 1, 0)) as medicao:
+                df = dataframe_de_valores(all_values)
+                if not df.empty:
+                    df = classificar_lista(df)
+                    if 'Data Final' in df.columns: df[COL_DATA_FINAL] = conversao_datas.converter_data_robusta(df['Data Final'])
+                    df = compactar_tipos(df)
+                    if 'ID' in df.columns:
+                        # A origem acabou de ser lida inteira: o índice de IDs sai de graça
+                        ids = np.full(len(all_values) - 1, '', dtype=object)
+                        ids[df.index.to_numpy()] = df['ID'].astype(str).to_numpy()
+                        registrar_indice_ids(PLANILHA_ORIGEM_NOME, ids, _coluna_link(all_values[0]))
+                medicao.linhas_saida = len(df)
+            estado["df"] = df
+            estado["versao"] = versao
+        estado["carregado_em"] = time.time()
+        return estado["df"].copy(deep=False), estado["versao"]
+
+def obter_origem_colunas(spreadsheet, colunas):
+    """
+    (df, versao) com só 'colunas' da origem, mais o ID e as colunas internas (classificação da 'Lista',
+    '_Data_Final'). Se o snapshot em memória ainda vale, sai dele sem I/O (versao = a do snapshot);
+    senão lê só essas colunas (versao = None), sem substituir o snapshot completo.
+    """
+    estado = _SNAPSHOT_ORIGEM
+    with estado["lock"]:
+        if estado["df"] is not None and (time.time() - estado["carregado_em"]) < SNAPSHOT_ORIGEM_TTL:
+            df = estado["df"]
+            manter = set(colunas) | {'ID'} | set(COLUNAS_INTERNAS)
+            return df[[c for c in df.columns if c in manter]].copy(deep=False), estado["versao"]
+    with etapa("origem projetada") as medicao:
+        df = carregar_aba_projetada(spreadsheet, PLANILHA_ORIGEM_NOME, colunas)
+        if not df.empty:
+            if 'Lista' in colunas: df = classificar_lista(df)
+            if 'Data Final' in df.columns: df[COL_DATA_FINAL] = conversao_datas.converter_data_robusta(df['Data Final'])
+        medicao.linhas_saida = len(df)
+    return df, None
+
+def invalidar_snapshot_origem():
+    """Chamar sempre que o próprio app escrever na aba de origem."""
+    estado = _SNAPSHOT_ORIGEM
+    with estado["lock"]:
+        estado["carregado_em"] = 0.0
+
+# ==============================================================================
+# ESCRITA INCREMENTAL (diff por ID)
+# ==============================================================================
+def _texto_da_coluna(serie):
+    """Valores de uma coluna como array object de str ('' para nulos), sem copiar o DataFrame."""
+    if isinstance(serie.dtype, pd.CategoricalDtype):
+        # Converte só as categorias; o código -1 (nulo) cai no '' anexado ao final
+        categorias = np.append(serie.cat.categories.astype(str).to_numpy(dtype=object), '')
+        return categorias[serie.cat.codes.to_numpy()]
+    texto = serie.to_numpy(dtype=object, na_value='')
+    if not pd.api.types.is_string_dtype(serie.dtype) or serie.dtype == object:
+        texto = np.array([v if isinstance(v, str) else str(v) for v in texto], dtype=object)
+    return texto
+
+def iterar_linhas(df, colunas=None, tamanho_bloco=LINHAS_POR_BLOCO_SERIALIZACAO):
+    """
+    Gera as linhas de df (listas de str, '' para nulos) em blocos de até 'tamanho_bloco' linhas.
+    'colunas' fixa a ordem de saída; colunas que df não tem saem vazias (equivale a reindex(fill_value='')).
+    Só um bloco convertido existe por vez: nada de fillna/astype/values sobre o DataFrame inteiro.
+    """
+    colunas = list(df.columns) if colunas is None else list(colunas)
+    presentes = set(df.columns)
+    for ini in range(0, len(df), tamanho_bloco):
+        fatia = df.iloc[ini:ini + tamanho_bloco]
+        vazio = [''] * len(fatia)
+        textos = [_texto_da_coluna(fatia[c]) if c in presentes else vazio for c in colunas]
+        yield [list(linha) for linha in zip(*textos)]
+
+@medido()
+def valores_do_dataframe(df):
+    """Cabeçalho + linhas como strings, no formato que vai para ws.update."""
+    df = remover_colunas_internas(df)
+    valores = [[str(c) for c in df.columns]]
+    for bloco in iterar_linhas(df): valores.extend(bloco)
+    return valores
+
+def _intervalos_contiguos(linhas):
+    """[5, 6, 7, 10] -> [(5, 7), (10, 10)]"""
+    intervalos = []
+    for r in sorted(linhas):
+        if intervalos and r == intervalos[-1][1] + 1: intervalos[-1][1] = r
+        else: intervalos.append([r, r])
+    return [tuple(i) for i in intervalos]
+
+# Lotes já gravados por (aba, fingerprint do payload): permite retomar uma escrita que falhou no meio.
+# A retomada só vale para a próxima ação nas mesmas abas (geração da trava, ver travar_abas) e
+# por ESCRITA_RETOMADA_TTL: se outra ação escreveu nelas no meio, as linhas podem ter mudado de
+# lugar e os lotes "já gravados" não valem mais.
+# concluidos: {chave: {"feitos": set(índices), "abas": tuple, "geracoes": tuple, "criado_em": float}}
+_ESCRITAS_EM_LOTES = {"lock": threading.Lock(), "concluidos": {}}
+
+def _retomada_valida(entrada, agora):
+    atuais = _geracoes_abas(entrada["abas"])
+    return (agora - entrada["criado_em"] < ESCRITA_RETOMADA_TTL
+            and all(g in (g0, g0 + 1) for g, g0 in zip(atuais, entrada["geracoes"])))
+
+def _fatiar_dados(dados, celulas_por_lote):
+    """
+    Quebra os itens {'range', 'values'} em faixas de linhas e agrupa em lotes de até 'celulas_por_lote' células.
+    Ranges com o nome da aba ("'Aba'!A1:B2") mantêm o prefixo.
+    """
+    lotes = []; atual = []; celulas = 0
+    for item in dados:
+        valores = item['values']
+        if not valores: continue
+        prefixo, _, a1 = item['range'].rpartition('!')
+        prefixo = prefixo + '!' if prefixo else ''
+        linha0, col0 = gspread.utils.a1_to_rowcol(a1.split(':')[0])
+        largura = max(len(l) for l in valores)
+        passo = max(1, celulas_por_lote // max(largura, 1))
+        for ini in range(0, len(valores), passo):
+            fatia = valores[ini:ini + passo]
+            n = len(fatia) * largura
+            if atual and celulas + n > celulas_por_lote:
+                lotes.append(atual); atual = []; celulas = 0
+            fim = gspread.utils.rowcol_to_a1(linha0 + ini + len(fatia) - 1, col0 + largura - 1)
+            atual.append({'range': f"{prefixo}{gspread.utils.rowcol_to_a1(linha0 + ini, col0)}:{fim}", 'values': fatia})
+            celulas += n
+    if atual: lotes.append(atual)
+    return lotes
+
+class _VariasAbas:
+    """Planilha vista como 'ws' por escrever_dados_em_lotes: ranges com nome da aba, um values_batch_update por lote."""
+
+    def __init__(self, spreadsheet, titulos):
+        self.spreadsheet = spreadsheet
+        self.titulos = list(titulos)
+        self.title = " + ".join(titulos)
+
+    def batch_update(self, dados, value_input_option='RAW'):
+        return self.spreadsheet.values_batch_update({'valueInputOption': value_input_option, 'data': dados})
+
+def escrever_dados_em_lotes(ws, dados, celulas_por_lote=CELULAS_POR_LOTE_ESCRITA):
+    """
+    Envia os itens {'range', 'values'} (como em ws.batch_update) em lotes de tamanho limitado,
+    com até ESCRITORES_PARALELOS requisições em voo (cada uma passa pelo limitador de cota).
+    A grade precisa já comportar os ranges (redimensione antes, uma vez só).
+    Se algum lote falhar, os que deram certo ficam registrados e a exceção sobe; repetir a
+    chamada com o mesmo payload retoma a partir dos lotes que faltaram (se nenhuma outra ação
+    travou as abas no meio e dentro de ESCRITA_RETOMADA_TTL; senão tudo é reenviado).
+    Retorna o número de lotes enviados nesta chamada.
+    """
+    lotes = _fatiar_dados(dados, celulas_por_lote)
+    if not lotes: return 0
+    estado = _ESCRITAS_EM_LOTES
+    abas = tuple(getattr(ws, 'titulos', [ws.title]))
+    # Fingerprint linha a linha, sem montar uma cópia do payload
+    chave = (ws.title, impressao_digital_valores(itertools.chain([d['range']], l) for d in dados for l in d['values']))
+    agora = time.time()
+    with estado["lock"]:
+        for k in [k for k, e in estado["concluidos"].items() if not _retomada_valida(e, agora)]:
+            del estado["concluidos"][k]
+        entrada = estado["concluidos"].setdefault(chave, {"feitos": set(), "abas": abas, "criado_em": agora})
+        entrada["geracoes"] = _geracoes_abas(abas)
+        feitos = set(entrada["feitos"])
+    pendentes = [i for i in range(len(lotes)) if i not in feitos]
+
+    def _enviar(i):
+        ws.batch_update(lotes[i], value_input_option='USER_ENTERED')
+        with estado["lock"]: entrada["feitos"].add(i)
+
+    erros = []
+    with etapa(f"escrever em lotes '{ws.title}' ({len(pendentes)} lotes)") as medicao:
+        medicao.celulas = sum(contar_celulas(item['values']) for i in pendentes for item in lotes[i])
+        if len(pendentes) == 1:
+            try: _enviar(pendentes[0])
+            except Exception as e: erros.append(e)
+        elif pendentes:
+            trabalhadores = max(1, min(ESCRITORES_PARALELOS, len(pendentes), cota_sheets.LIMITADOR.disponiveis("escrita")))
+            with ThreadPoolExecutor(max_workers=trabalhadores) as pool:
+                for k, futuro in enumerate([pool.submit(propagar(_enviar), i) for i in pendentes], 1):
+                    try: futuro.result()
+                    except Exception as e: erros.append(e)
+                    reportar(f"Gravando '{ws.title}'", lotes=f"{k}/{len(pendentes)}", falhas=len(erros))
+    with estado["lock"]:
+        feitos = set(entrada["feitos"])
+        if len(feitos) == len(lotes) and estado["concluidos"].get(chave) is entrada: del estado["concluidos"][chave]
+    if erros:
+        raise RuntimeError(f"Escrita parcial em '{ws.title}': {len(feitos)}/{len(lotes)} lotes gravados "
+                           f"({erros[0]}). Repita a ação para continuar de onde parou.")
+    return len(pendentes)
+
+@medido()
+def reescrever_aba_completa(ws, valores, linhas_antes=None, colunas_antes=None):
+    """
+    Regrava a aba inteira a partir de A1 sem passar por ws.clear(): ajusta a grade uma vez,
+    escreve em lotes (escrever_dados_em_lotes) e depois limpa apenas o que sobrou da
+    versão anterior (sem janela de aba vazia).
+    """
+    n_linhas = len(valores); n_cols = max((len(l) for l in valores), default=0)
+    if n_linhas > ws.row_count or n_cols > ws.col_count:
+        ws.resize(rows=max(n_linhas, ws.row_count), cols=max(n_cols, ws.col_count))
+    escrever_dados_em_lotes(ws, [{'range': 'A1', 'values': valores}])
+    if valores: registrar_indice_ids(ws.title, _ids_das_linhas(valores[0], valores[1:]), _coluna_link(valores[0]))
+    else: registrar_indice_ids(ws.title, None)
+
+    if linhas_antes is None or colunas_antes is None:
+        # Extensão anterior desconhecida: encolhe a grade para descartar as sobras
+        ws.resize(rows=max(n_linhas, 1), cols=max(n_cols, 1))
+        return
+    sobras = []
+    ultima_col = gspread.utils.rowcol_to_a1(1, max(colunas_antes, n_cols, 1)).rstrip('0123456789')
+    if linhas_antes > n_linhas:
+        sobras.append(f"A{n_linhas + 1}:{ultima_col}{linhas_antes}")
+    if colunas_antes > n_cols and n_linhas > 0:
+        inicio = gspread.utils.rowcol_to_a1(1, n_cols + 1).rstrip('0123456789')
+        sobras.append(f"{inicio}1:{ultima_col}{n_linhas}")
+    if sobras: ws.batch_clear(sobras)
+
+@medido()
+def _diferenca_por_chaves(atuais, valores, chaves=('ID',)):
+    """
+    Diferença entre o conteúdo atual da aba ('atuais', get_all_values com o mesmo cabeçalho) e 'valores'
+    (cabeçalho + linhas). Linhas casadas pelas 'chaves' (+ ordem de ocorrência, para IDs repetidos).
+    Retorna {'dados': itens {'range', 'values'} relativos à aba, 'linhas_grade': linhas que a grade precisa ter,
+    'removidas': linhas da planilha a deletar (crescente), 'layout': posição em valores[1:] de cada linha final,
+    'alteradas', 'inseridas', 'reaproveitadas'}.
+    """
+    cabecalho = valores[0]
+    largura = len(cabecalho)
+    idx_chaves = [cabecalho.index(c) for c in chaves]
+
+    def _chaveadas(linhas):
+        df = pd.DataFrame({'_chave': ["\x1f".join(l[i] for i in idx_chaves) for l in linhas]})
+        df['_ocorrencia'] = df.groupby('_chave').cumcount()
+        df['_pos'] = np.arange(len(df))
+        return df
+
+    linhas_atuais = [l[:largura] for l in atuais[1:]]
+    linhas_novas = valores[1:]
+    pares = _chaveadas(linhas_atuais).merge(_chaveadas(linhas_novas), on=['_chave', '_ocorrencia'],
+                                            how='outer', suffixes=('_atual', '_novo'), indicator=True)
+
+    dados = []
+    def _faixa(linha_planilha, col_ini, col_fim, conteudo):
+        ini = gspread.utils.rowcol_to_a1(linha_planilha, col_ini + 1)
+        fim = gspread.utils.rowcol_to_a1(linha_planilha, col_fim + 1)
+        dados.append({'range': f"{ini}:{fim}", 'values': [conteudo]})
+
+    # 1. Linhas presentes nos dois lados: envia apenas o trecho alterado
+    ambos = pares[pares['_merge'] == 'both']
+    alteradas = 0
+    if not ambos.empty:
+        arr_atual = np.array(linhas_atuais, dtype=object).reshape(-1, largura)[ambos['_pos_atual'].astype(int).values]
+        arr_novo = np.array(linhas_novas, dtype=object).reshape(-1, largura)[ambos['_pos_novo'].astype(int).values]
+        difere = arr_atual != arr_novo
+        for k in np.flatnonzero(difere.any(axis=1)):
+            cols = np.flatnonzero(difere[k])
+            c_ini, c_fim = int(cols[0]), int(cols[-1])
+            _faixa(int(ambos['_pos_atual'].iloc[k]) + 2, c_ini, c_fim, list(arr_novo[k, c_ini:c_fim + 1]))
+            alteradas += 1
+
+    # 2. Removidas x novas: reaproveita as linhas removidas antes de anexar/deletar
+    removidas = sorted(int(p) + 2 for p in pares.loc[pares['_merge'] == 'left_only', '_pos_atual'])
+    novas = sorted(int(p) for p in pares.loc[pares['_merge'] == 'right_only', '_pos_novo'])
+    reaproveitadas = min(len(removidas), len(novas))
+    for linha_planilha, pos in zip(removidas[:reaproveitadas], novas[:reaproveitadas]):
+        _faixa(linha_planilha, 0, largura - 1, linhas_novas[pos])
+    # Posição final (na aba) de cada linha do payload, para o índice de IDs
+    layout = np.full(len(linhas_atuais), -1)
+    layout[ambos['_pos_atual'].astype(int).values] = ambos['_pos_novo'].astype(int).values
+    layout[np.array(removidas[:reaproveitadas], dtype=int) - 2] = novas[:reaproveitadas]
+    removidas = removidas[reaproveitadas:]
+    novas = novas[reaproveitadas:]
+    layout = np.delete(np.concatenate([layout, np.array(novas, dtype=int)]), np.array(removidas, dtype=int) - 2)
+
+    # 3. Novas restantes vão para o final da aba
+    if novas:
+        ini = gspread.utils.rowcol_to_a1(len(atuais) + 1, 1)
+        fim = gspread.utils.rowcol_to_a1(len(atuais) + len(novas), largura)
+        dados.append({'range': f"{ini}:{fim}", 'values': [linhas_novas[p] for p in novas]})
+
+    return {"dados": dados, "linhas_grade": len(atuais) + len(novas), "removidas": removidas, "layout": layout,
+            "alteradas": alteradas, "inseridas": reaproveitadas + len(novas), "reaproveitadas": reaproveitadas}
+
+def _requests_remocao(sheet_id, linhas):
+    """deleteDimension por faixa contígua de 'linhas' (da planilha), de baixo para cima."""
+    return [{"deleteDimension": {"range": {"sheetId": sheet_id, "dimension": "ROWS",
+                                           "startIndex": ini - 1, "endIndex": fim}}}
+            for ini, fim in reversed(_intervalos_contiguos(linhas))]
+
+def _registrar_indice_diferenca(titulo, valores, dif):
+    ids_novos = _ids_das_linhas(valores[0], valores[1:])
+    registrar_indice_ids(titulo, ids_novos[dif["layout"]] if ids_novos is not None else None, _coluna_link(valores[0]))
+
+# ------------------------------------------------------------------------------
+# Travas de escrita por aba: as escritas por posição (diff por ID, deleção, blocos
+# da consolidada, histórico) valem para o conteúdo lido antes. Quem lê uma aba
+# para escrever nela segura a trava da aba da leitura até o fim da escrita, e as
+# ações (tarefas em segundo plano e deleção na tela) não se intercalam na mesma
+# aba. Cada ação pega todas as suas travas de uma vez (travar_abas), sempre na
+# mesma ordem: sem deadlock. Vale dentro do processo.
+# ------------------------------------------------------------------------------
+_TRAVAS_ABAS = {"lock": threading.Lock(), "abas": {}, "geracoes": {}} # titulo -> RLock / nº de ações que a travaram
+_travas_da_thread = threading.local() # titulo -> profundidade (reentrância na mesma thread)
+
+@contextmanager
+def travar_abas(titulos):
+    """
+    Segura a trava de escrita de cada aba de 'titulos' (reentrante na mesma thread). Cada vez que
+    uma ação pega a trava (não a mesma thread de novo), a geração da aba sobe (ver _retomada_valida).
+    """
+    titulos = sorted(set(titulos))
+    with _TRAVAS_ABAS["lock"]:
+        travas = [_TRAVAS_ABAS["abas"].setdefault(t, threading.RLock()) for t in titulos]
+    if not hasattr(_travas_da_thread, "abas"): _travas_da_thread.abas = {}
+    seguradas = _travas_da_thread.abas
+    with ExitStack() as pilha:
+        for trava in travas: pilha.enter_context(trava)
+        with _TRAVAS_ABAS["lock"]:
+            for t in titulos:
+                if not seguradas.get(t): _TRAVAS_ABAS["geracoes"][t] = _TRAVAS_ABAS["geracoes"].get(t, 0) + 1
+        for t in titulos: seguradas[t] = seguradas.get(t, 0) + 1
+        try: yield
+        finally:
+            for t in titulos: seguradas[t] -= 1
+
+def _geracoes_abas(titulos):
+    with _TRAVAS_ABAS["lock"]: return tuple(_TRAVAS_ABAS["geracoes"].get(t, 0) for t in titulos)
+
+@medido()
+def escrever_aba_incremental(ws, df_novo, chaves=('ID',)):
+    """
+    Grava df_novo na aba enviando apenas a diferença em relação ao conteúdo atual (ver _diferenca_por_chaves):
+    - Linhas alteradas: só o trecho de colunas que mudou.
+    - Linhas removidas: o espaço é reaproveitado pelas linhas novas; o que sobrar vira deleteDimension.
+    - Linhas novas restantes: anexadas ao final.
+    Os valores saem por escrever_dados_em_lotes (um único ws.batch_update quando cabem em um lote)
+    + um spreadsheet.batch_update só se houver linhas a remover.
+    Cabeçalho diferente (mudança de esquema) => regrava a aba inteira.
+    Retorna um dict com o modo usado e as contagens. A aba fica travada da leitura à escrita.
+    """
+    with travar_abas([ws.title]): return _escrever_aba_incremental(ws, df_novo, chaves)
+
+def _escrever_aba_incremental(ws, df_novo, chaves):
+    valores = valores_do_dataframe(df_novo)
+    atuais = ler_valores_aba(ws)
+
+    if not atuais or atuais[0] != valores[0] or any(c not in valores[0] for c in chaves):
+        reescrever_aba_completa(ws, valores,
+                                len(atuais) if atuais is not None else None,
+                                max((len(l) for l in atuais), default=0) if atuais is not None else None)
+        return {"modo": "completo", "linhas": len(valores) - 1}
+
+    dif = _diferenca_por_chaves(atuais, valores, chaves)
+    if dif["linhas_grade"] > ws.row_count: ws.add_rows(dif["linhas_grade"] - ws.row_count)
+    escrever_dados_em_lotes(ws, dif["dados"])
+    # Sobrou linha removida: deleta em faixas, de baixo para cima
+    if dif["removidas"]: ws.spreadsheet.batch_update({"requests": _requests_remocao(ws.id, dif["removidas"])})
+
+    _registrar_indice_diferenca(ws.title, valores, dif)
+    return {"modo": "diferencial", "alteradas": dif["alteradas"], "inseridas": dif["inseridas"],
+            "removidas": len(dif["removidas"]) + dif["reaproveitadas"]}
+
+# ==============================================================================
+# ÍNDICE DE IDs (ID -> linhas, por aba)
+# ==============================================================================
+# Para cada aba com coluna 'Link', guarda o ID (derivado do Link, como em
+# regenerar_id_pelo_link) de cada linha, na ordem da aba. É atualizado pelas
+# escritas do app (reescrita completa, escrita diferencial, deleção) e pela carga
+# do snapshot da origem; a consolidação descarta o da aba consolidada (refeito na
+# próxima deleção). Linhas incluídas ou movidas fora do app (direto na planilha)
+# não passam por aqui: a deleção confere o índice numa leitura em lote (as células
+# Link das linhas que vai apagar e o fim de cada aba) e só reindexa as abas que
+# não conferem.
+# abas: {titulo: {"ids": array object (linha 2 em diante), "coluna_link": int | None,
+#                  "criado_em": float, "posicoes": dict | None}}
+_INDICE_IDS = {"lock": threading.Lock(), "abas": {}}
+
+def _id_do_link(link):
+    return str(link).split('/')[-1].strip()
+
+def _coluna_link(cabecalho):
+    """Número (1-based) da coluna 'Link' no cabeçalho, ou None."""
+    cabecalho = [str(c).strip() for c in cabecalho]
+    return cabecalho.index('Link') + 1 if 'Link' in cabecalho else None
+
+def _ids_das_linhas(cabecalho, linhas):
+    """IDs (pelo Link) de linhas no formato de get_all_values. None se não houver coluna 'Link'."""
+    col = _coluna_link(cabecalho)
+    if col is None: return None
+    return np.array([_id_do_link(l[col - 1]) if col - 1 < len(l) else '' for l in linhas], dtype=object)
+
+def registrar_indice_ids(titulo, ids, coluna_link=None):
+    """Guarda os IDs por linha de 'titulo' (ids[0] = linha 2). ids=None descarta o índice da aba."""
+    estado = _INDICE_IDS
+    with estado["lock"]:
+        if ids is None: estado["abas"].pop(titulo, None)
+        else: estado["abas"][titulo] = {"ids": np.asarray(ids, dtype=object), "coluna_link": coluna_link,
+                                        "criado_em": time.time(), "posicoes": None}
+
+def _linhas_dos_ids(titulo, ids):
+    """
+    (coluna_link, {id: [linhas da planilha]}) pelo índice de 'titulo', só com os IDs presentes.
+    None se a aba não está indexada.
+    """
+    estado = _INDICE_IDS
+    with estado["lock"]:
+        entrada = estado["abas"].get(titulo)
+        if entrada is None: return None
+        if entrada["posicoes"] is None:
+            entrada["posicoes"] = pd.Series(np.arange(len(entrada["ids"]))).groupby(entrada["ids"], sort=False).indices
+        linhas = {i: [int(p) + 2 for p in entrada["posicoes"][i]] for i in ids if i in entrada["posicoes"]}
+        return entrada["coluna_link"], linhas
+
+def _ids_indexados(titulo):
+    """(coluna_link, ids) do índice de 'titulo', ou None se a aba não está indexada."""
+    estado = _INDICE_IDS
+    with estado["lock"]:
+        entrada = estado["abas"].get(titulo)
+        return None if entrada is None else (entrada["coluna_link"], entrada["ids"])
+
+def _remover_do_indice(titulo, linhas):
+    estado = _INDICE_IDS
+    with estado["lock"]:
+        entrada = estado["abas"].get(titulo)
+        if entrada is None: return
+        entrada["ids"] = np.delete(entrada["ids"], np.array(linhas, dtype=int) - 2)
+        entrada["posicoes"] = None
+
+def _ler_faixas_em_lote(spreadsheet, ranges):
+    """values_batch_get de muitos ranges (FAIXAS_POR_LEITURA por chamada). Retorna a lista de valores, na ordem."""
+    saida = []
+    for i in range(0, len(ranges), FAIXAS_POR_LEITURA):
+        resposta = spreadsheet.values_batch_get(ranges[i:i + FAIXAS_POR_LEITURA])
+        saida.extend(vr.get('values', []) for vr in resposta.get('valueRanges', []))
+    return saida
+
+def _letra_coluna(col):
+    return gspread.utils.rowcol_to_a1(1, col).rstrip('0123456789')
+
+def indexar_abas(spreadsheet, titulos):
+    """(Re)constrói o índice das abas lendo só a coluna Link (ler_colunas_em_lote: 1 chamada em lote + cabeçalhos fora do cache)."""
+    lidos = ler_colunas_em_lote(spreadsheet, {t: ['Link'] for t in titulos})
+    cabecalhos = ler_cabecalhos(spreadsheet, [t for t in titulos if t in lidos])
+    for titulo, valores in lidos.items():
+        col = _coluna_link(cabecalhos[titulo])
+        if col is None: registrar_indice_ids(titulo, np.array([], dtype=object))
+        else: registrar_indice_ids(titulo, np.array([_id_do_link(l[0]) for l in valores[1:]], dtype=object), col)
+
+def _localizar_pelo_indice(titulos, ids):
+    """{aba: linhas da planilha (crescente)} dos 'ids' pelo índice, só abas com alguma linha."""
+    alvos = {}
+    for titulo in titulos:
+        col, linhas = _linhas_dos_ids(titulo, ids) or (None, None)
+        if col and linhas: alvos[titulo] = sorted(l for ls in linhas.values() for l in ls)
+    return alvos
+
+def _conferir_indice(spreadsheet, titulos, alvos):
+    """
+    Confere o índice com a planilha numa leitura em lote (_ler_faixas_em_lote): as células Link das
+    linhas em 'alvos' e, por aba, da última linha indexada até o fim (linhas incluídas ou apagadas
+    fora do app mudam o fim da aba). Retorna as abas cujo índice não confere.
+    """
+    faixas = [] # (aba, range, IDs esperados; depois deles, só células vazias)
+    for titulo in titulos:
+        col, ids = _ids_indexados(titulo) or (None, None)
+        if not col: continue
+        letra = _letra_coluna(col)
+        for ini, fim in _intervalos_contiguos(alvos.get(titulo, [])):
+            faixas.append((titulo, f"{letra}{ini}:{letra}{fim}", list(ids[ini - 2:fim - 1])))
+        faixas.append((titulo, f"{letra}{len(ids) + 1}:{letra}" if len(ids) else f"{letra}2:{letra}", list(ids[-1:])))
+    if not faixas: return []
+    lidos = _ler_faixas_em_lote(spreadsheet, [gspread.utils.absolute_range_name(t, r) for t, r, _ in faixas])
+    erradas = []
+    for (titulo, _, esperados), valores in zip(faixas, lidos):
+        achados = [_id_do_link(l[0]) if l else '' for l in valores]
+        achados += [''] * (len(esperados) - len(achados))
+        if (achados[:len(esperados)] != esperados or any(achados[len(esperados):])) and titulo not in erradas:
+            erradas.append(titulo)
+    return erradas
+
+def _abas_com_tarefas(spreadsheet):
+    """Abas onde uma tarefa pode aparecer: origem, Backlog, abas de mês e consolidada."""
+    fixas = {PLANILHA_ORIGEM_NOME, PLANILHA_BACKLOG_NOME, PLANILHA_CONSOLIDADA_NOME}
+    return {ws.title: ws for ws in spreadsheet.worksheets() if ws.title in fixas or extrair_mes_ano_da_aba(ws.title)}
+
+def _ajustar_meta_apos_delecao(spreadsheet, linhas_removidas):
+    """Desconta do ConsolidacaoMeta as linhas apagadas da aba consolidada (cada bloco encolhe)."""
+    meta = _ler_meta_consolidacao(spreadsheet)
+    if meta is None: return
+    removidas = np.array(sorted(linhas_removidas))
+    blocos = []
+    for aba, b in sorted(meta["blocos"].items(), key=lambda kv: kv[1]["inicio"]):
+        dentro = np.count_nonzero((removidas >= b["inicio"]) & (removidas < b["inicio"] + b["linhas"]))
+        blocos.append({'aba': aba, 'fingerprint': b["fingerprint"], 'linhas': b["linhas"] - int(dentro)})
+    _gravar_meta_consolidacao(spreadsheet, meta["cabecalho"], blocos)
+
+def deletar_tarefas_global(ids):
+    """
+    Apaga as linhas dos IDs em todas as abas que os contêm (origem, Backlog, meses, consolidada).
+    - Localiza as linhas pelo índice de IDs, já com as abas travadas (abas sem índice são indexadas
+      lendo só a coluna Link) e confere numa leitura em lote as células Link dessas linhas e o fim de
+      cada aba: o índice não vê linhas incluídas fora do app. Só as abas que não conferem são
+      reindexadas (e as linhas delas localizadas de novo).
+    - Todas as remoções saem em um único spreadsheet.batch_update (deleteDimension, de baixo para cima).
+    - Atualiza o índice, o espelho local, o ConsolidacaoMeta e invalida o snapshot da origem.
+    Retorna {aba: linhas removidas} (só abas com remoção).
+    """
+    spreadsheet = obter_spreadsheet_cacheada()
+    ids = list(dict.fromkeys(str(i).strip() for i in ids if str(i).strip()))
+    if not ids: return {}
+    abas = _abas_com_tarefas(spreadsheet)
+    # Localização e remoção por posição sem outra ação escrevendo nas mesmas abas
+    with travar_abas(list(abas) + [PLANILHA_META_CONSOLIDACAO_NOME]): return _deletar_nas_abas(spreadsheet, abas, ids)
+
+def _deletar_nas_abas(spreadsheet, abas, ids):
+    sem_indice = [t for t in abas if _ids_indexados(t) is None]
+    if sem_indice: indexar_abas(spreadsheet, sem_indice)
+    alvos = _localizar_pelo_indice(abas, ids)
+    erradas = _conferir_indice(spreadsheet, [t for t in abas if t not in sem_indice], alvos)
+    if erradas:
+        logger.info("Índice de IDs desatualizado em %s: reindexando", erradas)
+        indexar_abas(spreadsheet, erradas)
+        for titulo in erradas: alvos.pop(titulo, None)
+        alvos.update(_localizar_pelo_indice(erradas, ids))
+    if not alvos: return {}
+
+    spreadsheet.batch_update({"requests": [r for titulo, linhas in alvos.items()
+                                           for r in _requests_remocao(abas[titulo].id, linhas)]})
+
+    for titulo, linhas in alvos.items():
+        _remover_do_indice(titulo, linhas)
+        if titulo != PLANILHA_ORIGEM_NOME: espelho_local.remover_ids(titulo, ids)
+    if PLANILHA_ORIGEM_NOME in alvos: invalidar_snapshot_origem()
+    if PLANILHA_CONSOLIDADA_NOME in alvos:
+        try: _ajustar_meta_apos_delecao(spreadsheet, alvos[PLANILHA_CONSOLIDADA_NOME])
+        except Exception: pass # meta inconsistente só força reconstrução completa na próxima consolidação
+    return {t: len(linhas) for t, linhas in alvos.items()}
+
+# ==============================================================================
+# LOGIN
+# ==============================================================================
+def check_credentials(username, password):
+    """
+    Login local: confere usuário/senha no índice de credenciais em memória (hash com sal,
+    comparação em tempo constante). Só o primeiro login do processo lê a aba 'Senhas';
+    depois uma thread a relê a cada REFERENCIA_TTL segundos, fora do caminho do login.
+    Enquanto a aba nunca foi lida, uma falha de leitura só vale por REFERENCIA_TTL_FALHA segundos:
+    os logins voltam assim que o Sheets responde.
+    """
+    try:
+        # A thread começa mesmo se a primeira leitura falhar
+        manter_atualizada(PLANILHA_SENHAS_NOME, obter_spreadsheet_cacheada, derivar_senhas, ttl_falha=REFERENCIA_TTL_FALHA)
+        indice = referencia_em_cache(PLANILHA_SENHAS_NOME)
+        if indice is None:
+            spreadsheet = obter_spreadsheet_cacheada()
+            if spreadsheet is None: return None
+            indice = obter_referencia(spreadsheet, PLANILHA_SENHAS_NOME, derivar_senhas, ttl_falha=REFERENCIA_TTL_FALHA)
+        return conferir_credenciais(indice, username, password)
+    except Exception:
+        logger.exception("Falha ao conferir credenciais")
+        return None
+
+# ==============================================================================
+# AÇÕES DO SISTEMA
+# ==============================================================================
+@medido()
+def _filtrar_meses(df_origem, meses):
+    """
+    {(mes, ano): DataFrame} com as tarefas de cada mês pedido. Mês atual/futuro: tarefas do mês
+    + Backlog (sem data); mês passado: apenas o mês exato. Usa a 'Data Final' já convertida no
+    snapshot e agrupa a origem por (ano, mês) uma vez só, para todos os meses.
+    """
+    if COL_DATA_FINAL not in df_origem.columns:
+        df = remover_colunas_internas(df_origem)
+        return {m: df for m in meses}
+    datas = df_origem[COL_DATA_FINAL]
+    posicoes = pd.Series(np.arange(len(df_origem))).groupby((datas.dt.year * 100 + datas.dt.month).to_numpy()).indices
+    sem_data = np.flatnonzero(datas.isna().to_numpy())
+    hoje = datetime.now()
+    df = remover_colunas_internas(df_origem)
+    resultado = {}
+    for mes, ano in meses:
+        sel = posicoes.get(ano * 100 + mes, np.array([], dtype=int))
+        if (ano, mes) >= (hoje.year, hoje.month): sel = np.sort(np.concatenate([sel, sem_data]))
+        resultado[(mes, ano)] = df.iloc[sel]
+    return resultado
+
+def sincronizar_meses(nomes_abas):
+    """
+    Copia dados da Planilha Base (Total BaseCamp Consolidado) para várias abas de mês de uma vez.
+    IGNORA tarefas [ARCHIVED]; regra de datas em _filtrar_meses.
+    Uma leitura da origem (snapshot) e uma das abas de destino. A escrita é conjunta:
+    abas novas/grade maior num spreadsheet.batch_update, a diferença de todas as abas em
+    values_batch_update (escrever_dados_em_lotes) e as linhas removidas num batch_update final.
+    """
+    spreadsheet = obter_spreadsheet_cacheada()
+    meses = {}
+    for nome in nomes_abas:
+        mes_ano = extrair_mes_ano_da_aba(nome)
+        if not mes_ano: return f"Nome da aba '{nome}' inválido."
+        meses[nome] = mes_ano
+    if not meses: return "Nenhuma aba de mês selecionada."
+
+    try:
+        df_origem, _ = obter_snapshot_origem(spreadsheet)
+    except: return f"Aba Origem '{PLANILHA_ORIGEM_NOME}' não encontrada."
+    if df_origem.empty: return "Origem vazia."
+
+    # --- FILTRO DE EXCLUSÃO DE ARQUIVADAS ---
+    df_origem = df_origem[~df_origem[COL_ARQUIVADA]]
+    cols_drop = obter_lista_colunas_para_remover(spreadsheet)
+    por_mes = _filtrar_meses(df_origem, list(meses.values()))
+    dfs = {nome: por_mes[m].drop(columns=[c for c in cols_drop if c in por_mes[m].columns]) for nome, m in meses.items()}
+    del df_origem, por_mes
+    # Leitura das abas de destino e escrita da diferença sem outra ação no meio
+    with travar_abas(dfs): return _gravar_abas_de_mes(spreadsheet, dfs)
+
+def _gravar_abas_de_mes(spreadsheet, dfs):
+    """Parte de sincronizar_meses que lê as abas de destino e grava a diferença ({nome: DataFrame final})."""
+    abas = {ws.title: ws for ws in spreadsheet.worksheets()}
+    reportar("Lendo as abas de mês", abas=len(dfs))
+    try: atuais = ler_abas_em_paralelo(spreadsheet, [n for n in dfs if n in abas], levantar=True)
+    except Exception as e: return f"Erro ao ler as abas: {e}"
+    falhas = [n for n in dfs if n in abas and n not in atuais]
+    if falhas: return f"Erro ao ler as abas: {', '.join(falhas)}"
+
+    estrutura = []; dados = []; remocoes = []; diferencas = {}; valores_finais = {}
+    for nome, df_final in dfs.items():
+        valores = valores_do_dataframe(df_final)
+        n_cols = len(valores[0])
+        ws = abas.get(nome); atual = atuais.get(nome)
+        if ws is None:
+            # Aba nova já no tamanho final
+            grade = {"rowCount": max(len(valores), 100), "columnCount": max(n_cols, 1)}
+            estrutura.append({"addSheet": {"properties": {"title": nome, "gridProperties": grade}}})
+            itens = [{'range': 'A1', 'values': valores}]
+        elif atual and atual[0] == valores[0] and 'ID' in valores[0]:
+            diferencas[nome] = dif = _diferenca_por_chaves(atual, valores)
+            itens = dif["dados"]
+            remocoes.extend(_requests_remocao(ws.id, dif["removidas"]))
+            linhas_grade, colunas_grade = dif["linhas_grade"], n_cols
+        else:
+            # Aba vazia ou esquema diferente: regrava a partir de A1, com '' nas colunas que sobrarem
+            largura_antes = max((len(l) for l in atual), default=0)
+            if largura_antes > n_cols: itens = [{'range': 'A1', 'values': [l + [''] * (largura_antes - n_cols) for l in valores]}]
+            else: itens = [{'range': 'A1', 'values': valores}]
+            if len(atual) > len(valores): remocoes.extend(_requests_remocao(ws.id, range(len(valores) + 1, len(atual) + 1)))
+            linhas_grade, colunas_grade = len(valores), max(n_cols, largura_antes)
+        if ws is not None:
+            for dimensao, falta in (("ROWS", linhas_grade - ws.row_count), ("COLUMNS", colunas_grade - ws.col_count)):
+                if falta > 0: estrutura.append({"appendDimension": {"sheetId": ws.id, "dimension": dimensao, "length": falta}})
+        dados.extend({'range': gspread.utils.absolute_range_name(nome, i['range']), 'values': i['values']} for i in itens)
+        valores_finais[nome] = valores
+    del atuais
+
+    try:
+        if estrutura: spreadsheet.batch_update({"requests": estrutura})
+    except Exception as e: return f"Erro criar aba: {e}"
+    try:
+        reportar("Gravando as abas de mês", abas=len(dfs), faixas=len(dados))
+        escrever_dados_em_lotes(_VariasAbas(spreadsheet, list(dfs)), dados)
+        if remocoes: spreadsheet.batch_update({"requests": remocoes})
+    except Exception as e: return f"Erro salvar: {e}"
+
+    reportar("Atualizando o espelho local")
+    with etapa("espelho local e índice de IDs", linhas_entrada=sum(len(df) for df in dfs.values())):
+        for nome, valores in valores_finais.items():
+            if nome in diferencas: _registrar_indice_diferenca(nome, valores, diferencas[nome])
+            else: registrar_indice_ids(nome, _ids_das_linhas(valores[0], valores[1:]), _coluna_link(valores[0]))
+            espelho_local.gravar_aba(nome, dfs[nome])
+    return "Sucesso! " + ", ".join(f"'{nome}': {len(df)} linhas" for nome, df in dfs.items())
+
+def sincronizar_basecamp_com_mes_especifico(nome_aba_destino):
+    """
+    Copia dados da Planilha Base (Total BaseCamp Consolidado) para uma aba de mês específica.
+    IGNORA tarefas [ARCHIVED].
+    Mantém filtro de datas para popular a aba do mês corretamente (Mês Atual vs Histórico).
+    """
+    return sincronizar_meses([nome_aba_destino])
+
+def atualizar_aba_backlog():
+    """
+    Lê a origem, IGNORA ARQUIVADAS, filtra 'Backlog' na coluna Lista e salva.
+    """
+    spreadsheet = obter_spreadsheet_cacheada()
+    
+    try:
+        df_origem, _ = obter_snapshot_origem(spreadsheet)
+    except: return f"Aba Origem '{PLANILHA_ORIGEM_NOME}' não encontrada."
+    
+    if df_origem.empty: return "Origem vazia."
+    
+    if 'Lista' not in df_origem.columns: return "Coluna 'Lista' não encontrada na origem."
+
+    # --- FILTRO DE EXCLUSÃO DE ARQUIVADAS ---
+    df_origem = df_origem[~df_origem[COL_ARQUIVADA]]
+    # ----------------------------------------
+        
+    # Filtra Backlog
+    df_backlog = remover_colunas_internas(df_origem[df_origem[COL_BACKLOG]])
+    
+    cols_drop = obter_lista_colunas_para_remover(spreadsheet)
+    df_backlog = df_backlog.drop(columns=[c for c in cols_drop if c in df_backlog.columns], errors='ignore')
+    
+    try:
+        try: 
+            ws_backlog = spreadsheet.worksheet(PLANILHA_BACKLOG_NOME)
+        except gspread.exceptions.WorksheetNotFound:
+            ws_backlog = spreadsheet.add_worksheet(title=PLANILHA_BACKLOG_NOME, rows=max(len(df_backlog) + 1, 100),
+                                                   cols=max(len(df_backlog.columns), 1))
+            
+        reportar(f"Gravando '{PLANILHA_BACKLOG_NOME}'", linhas=len(df_backlog))
+        escrever_aba_incremental(ws_backlog, df_backlog)
+        reportar("Atualizando o espelho local")
+        with etapa("espelho local", linhas_entrada=len(df_backlog)): espelho_local.gravar_aba(PLANILHA_BACKLOG_NOME, df_backlog)
+        return f"Sucesso! {len(df_backlog)} tarefas no Backlog."
+    except Exception as e: return f"Erro ao salvar Backlog: {e}"
+
+# ------------------------------------------------------------------------------
+# Consolidação incremental: cada aba de mês vira um bloco contíguo de linhas na
+# aba consolidada. A aba 'ConsolidacaoMeta' guarda, por mês, o fingerprint do
+# conteúdo (linhas:sha1), a linha inicial e o tamanho do bloco. Na próxima
+# consolidação só os blocos cujo fingerprint mudou são substituídos.
+# ------------------------------------------------------------------------------
+META_CABECALHO = ["Aba", "Fingerprint", "Linha_Inicio", "Linhas"]
+META_CHAVE_CABECALHO = "__CABECALHO__"
+
+@medido()
+def _limpar_bloco_mes(df_mes, titulo):
+    # --- FILTRO DE EXCLUSÃO DE ARQUIVADAS ---
+    df_mes = classificar_lista(df_mes)
+    df_mes = remover_colunas_internas(df_mes[~df_mes[COL_ARQUIVADA]])
+    
+    # Identifica a fonte do snapshot (ex: "Snapshot: Novembro 2024")
+    df_mes['Fonte_Dados'] = f"Snapshot: {titulo}"
+    return compactar_tipos(df_mes)
+
+def _colunas_bloco(valores):
+    """Colunas que _limpar_bloco_mes(dataframe_de_valores(valores)) teria, lendo só o cabeçalho."""
+    cols = [str(c).strip() for c in colunas_de_cabecalho(valores[0])]
+    if 'Link' in cols and 'ID' not in cols: cols.append('ID')
+    if 'Fonte_Dados' not in cols: cols.append('Fonte_Dados')
+    return cols
+
+def _ler_meta_consolidacao(spreadsheet):
+    """{'cabecalho': str, 'blocos': {aba: {...}}} ou None se não houver metadados utilizáveis."""
+    try: valores = spreadsheet.worksheet(PLANILHA_META_CONSOLIDACAO_NOME).get_all_values()
+    except: return None
+    if not valores or valores[0][:4] != META_CABECALHO: return None
+    meta = {"cabecalho": None, "blocos": {}}
+    try:
+        for linha in valores[1:]:
+            if linha[0] == META_CHAVE_CABECALHO: meta["cabecalho"] = linha[1]; continue
+            meta["blocos"][linha[0]] = {"fingerprint": linha[1], "inicio": int(linha[2]), "linhas": int(linha[3])}
+    except (ValueError, IndexError): return None
+    return meta if meta["cabecalho"] is not None else None
+
+@medido()
+def _gravar_meta_consolidacao(spreadsheet, assinatura_cabecalho, blocos):
+    linhas = [META_CABECALHO, [META_CHAVE_CABECALHO, assinatura_cabecalho, "", ""]]
+    inicio = 2 # linha 1 é o cabeçalho da aba consolidada
+    for b in blocos:
+        linhas.append([b['aba'], b['fingerprint'], str(inicio), str(b['linhas'])])
+        inicio += b['linhas']
+    try: ws_meta = spreadsheet.worksheet(PLANILHA_META_CONSOLIDACAO_NOME)
+    except gspread.exceptions.WorksheetNotFound:
+        ws_meta = spreadsheet.add_worksheet(title=PLANILHA_META_CONSOLIDACAO_NOME, rows=100, cols=len(META_CABECALHO))
+    atuais = ler_valores_aba(ws_meta)
+    reescrever_aba_completa(ws_meta, linhas, len(atuais) if atuais is not None else None,
+                            len(META_CABECALHO) if atuais is not None else None)
+
+def _invalidar_meta_consolidacao(spreadsheet):
+    """Apaga a assinatura do cabeçalho no meta (uma escrita): até o meta ser regravado, a consolidação é completa."""
+    celula = gspread.utils.absolute_range_name(PLANILHA_META_CONSOLIDACAO_NOME, "B2")
+    spreadsheet.values_batch_update({'valueInputOption': 'RAW', 'data': [{'range': celula, 'values': [[""]]}]})
+
+def _meta_confere_com_aba(ws_final, cabecalho, meta):
+    """Confere (lendo só a coluna Fonte_Dados) se os blocos da aba consolidada estão onde o meta diz."""
+    try: fontes = ws_final.col_values(cabecalho.index('Fonte_Dados') + 1)
+    except: return False
+    blocos = sorted(meta["blocos"].items(), key=lambda kv: kv[1]["inicio"])
+    total = 1 + sum(b["linhas"] for _, b in blocos)
+    if len(fontes) != total: return False
+    fontes = pd.Series(fontes[1:])
+    esperado = pd.Series([f"Snapshot: {aba}" for aba, b in blocos for _ in range(b["linhas"])], dtype=object)
+    inicios_ok = all(b["inicio"] == i for (_, b), i in zip(blocos, np.cumsum([2] + [b["linhas"] for _, b in blocos[:-1]])))
+    return inicios_ok and fontes.astype(str).equals(esperado.astype(str))
+
+def _linhas_bloco(df, cabecalho):
+    linhas = []
+    for bloco in iterar_linhas(df, cabecalho): linhas.extend(bloco)
+    return linhas
+
+def _anexar_linhas(ws, linha, valores):
+    """
+    Grava 'valores' a partir da 'linha' (1-based). Se a grade não comporta, ela pelo menos dobra
+    (poucas chamadas de redimensionamento; quem anexa corta a sobra no fim). Retorna a próxima linha livre.
+    """
+    fim = linha + len(valores) - 1
+    if fim > ws.row_count: ws.add_rows(max(fim - ws.row_count, ws.row_count))
+    escrever_dados_em_lotes(ws, [{'range': f"A{linha}", 'values': valores}])
+    return fim + 1
+
+# ------------------------------------------------------------------------------
+# Consolidação em fluxo: as abas de mês passam uma a uma por uma cadeia de
+# geradores (ler -> limpar -> gravar na planilha -> espelho local), puxada pelo
+# último estágio. A leitura vem em janelas de ABAS_POR_JANELA abas (uma
+# values_batch_get por janela, até LEITORES_PARALELOS janelas baixando ao mesmo
+# tempo, entregues na ordem dos meses) e a gravação da reconstrução junta até
+# CELULAS_POR_LOTE_ESCRITA * ESCRITORES_PARALELOS células por envio: a memória
+# fica em ~LEITORES_PARALELOS + 1 janelas de valores brutos + um lote de escrita,
+# qualquer que seja o número de snapshots. Janelas maiores = menos chamadas e
+# mais memória. O cabeçalho final (união das colunas) sai antes dos dados, só da
+# linha 1 de cada aba. A reconstrução grava na própria aba consolidada (mesmo
+# sheetId) com o meta invalidado antes: uma falha no meio deixa só o layout novo,
+# incompleto, e a próxima consolidação reconstrói.
+# ------------------------------------------------------------------------------
+def _ler_meses_em_fluxo(spreadsheet, titulos, por_janela=ABAS_POR_JANELA):
+    """
+    Estágio de leitura: gera (titulo, valores) na ordem de 'titulos'. As abas são baixadas em janelas
+    de 'por_janela' (uma values_batch_get por janela), com até LEITORES_PARALELOS janelas em voo
+    (limitadas pelos tokens de leitura livres): cada janela entregue ao resto do fluxo libera o
+    download de mais uma. Leitura que falha levanta a exceção da API (RuntimeError se faltar uma aba
+    na resposta).
+    """
+    janelas = [titulos[i:i + por_janela] for i in range(0, len(titulos), por_janela)]
+    if not janelas: return
+    leitores = max(1, min(LEITORES_PARALELOS, len(janelas), cota_sheets.LIMITADOR.disponiveis("leitura")))
+    ler = propagar(lambda janela: ler_valores_em_lote(spreadsheet, janela, len(janela), levantar=True))
+    pool = ThreadPoolExecutor(max_workers=leitores, thread_name_prefix="leitura")
+    try:
+        em_voo = deque(pool.submit(ler, janela) for janela in janelas[:leitores])
+        for i, janela in enumerate(janelas):
+            lidos = em_voo.popleft().result()
+            if i + leitores < len(janelas): em_voo.append(pool.submit(ler, janelas[i + leitores]))
+            for titulo in janela:
+                valores = lidos.pop(titulo, None)
+                if valores is None: raise RuntimeError(f"não foi possível ler a aba '{titulo}'")
+                yield titulo, valores
+            del lidos
+    finally:
+        # Fluxo abandonado ou com falha: janelas ainda na fila não chegam a ser baixadas
+        pool.shutdown(wait=True, cancel_futures=True)
+
+def _blocos_em_fluxo(lidos, blocos_meta, processar_todos, progresso="Consolidando as abas de mês"):
+    """
+    Estágio de limpeza: (titulo, valores) -> bloco {'aba', 'fingerprint', 'alterado', 'df', 'linhas'}.
+    Abas sem linhas não geram bloco. Meses inalterados (fingerprint igual ao do meta) só viram
+    DataFrame com processar_todos; sem isso saem com df None e o tamanho registrado no meta.
+    """
+    for k, (titulo, valores) in enumerate(lidos, 1):
+        reportar(progresso, aba=titulo, meses=k)
+        if len(valores) < 2: continue
+        fingerprint = impressao_digital_valores(valores)
+        anterior = blocos_meta.get(titulo)
+        alterado = not anterior or anterior["fingerprint"] != fingerprint
+        if not alterado and not processar_todos:
+            yield {'aba': titulo, 'fingerprint': fingerprint, 'alterado': False, 'df': None,
+                   'linhas': anterior["linhas"]}
+            continue
+        df_mes = dataframe_de_valores(valores)
+        del valores
+        if df_mes.empty: continue
+        # ADICIONA AO CONSOLIDADO SEM FILTRO DE DATA
+        df_mes = _limpar_bloco_mes(df_mes, titulo)
+        yield {'aba': titulo, 'fingerprint': fingerprint, 'alterado': alterado, 'df': df_mes, 'linhas': len(df_mes)}
+        del df_mes
+
+def _gravar_consolidada_do_zero(ws_final, cabecalho, blocos):
+    """
+    Estágio de gravação (reconstrução): cabeçalho em A1 e os blocos logo abaixo, na ordem, enviados
+    em lotes de até CELULAS_POR_LOTE_ESCRITA * ESCRITORES_PARALELOS células; a grade cresce com os
+    lotes. No fim a grade é cortada no tamanho final. Gera cada bloco assim que ele entra num lote.
+    Grava na própria aba (mesmo sheetId: fórmulas, gráficos e proteções continuam apontando para ela).
+    Se o fluxo falha depois do primeiro lote, a aba é cortada logo após o último lote gravado: fica só
+    o layout novo, incompleto (o meta já foi invalidado e a próxima consolidação reconstrói).
+    """
+    if len(cabecalho) > ws_final.col_count: ws_final.resize(cols=len(cabecalho))
+    limite = CELULAS_POR_LOTE_ESCRITA * ESCRITORES_PARALELOS
+    proxima = 1; pendentes = [cabecalho]
+    try:
+        for b in blocos:
+            pendentes.extend(_linhas_bloco(b['df'], cabecalho))
+            if len(pendentes) * len(cabecalho) >= limite:
+                proxima = _anexar_linhas(ws_final, proxima, pendentes); pendentes = []
+            yield b
+        if pendentes: proxima = _anexar_linhas(ws_final, proxima, pendentes)
+    except BaseException:
+        if proxima > 1:
+            try: ws_final.resize(rows=proxima - 1)
+            except Exception: logger.exception("Não foi possível cortar a aba '%s' após a falha", ws_final.title)
+        raise
+    if ws_final.row_count != proxima - 1 or ws_final.col_count != len(cabecalho):
+        ws_final.resize(rows=proxima - 1, cols=len(cabecalho))
+
+def _gravar_blocos_alterados(ws_final, cabecalho, blocos, meta):
+    """
+    Estágio de gravação (incremental): cada bloco alterado/novo substitui o antigo assim que chega
+    (insert/deleteDimension num spreadsheet.batch_update e os valores logo depois); blocos de meses
+    que saíram são removidos no caminho. A ordem dos meses já foi conferida com o meta.
+    Gera todos os blocos (inclusive os inalterados) depois de gravados.
+    """
+    fila_antigos = sorted(meta["blocos"].items(), key=lambda kv: kv[1]["inicio"])
+    requests = []
+    def _dimensao(tipo, ini, fim):
+        rng = {"sheetId": ws_final.id, "dimension": "ROWS", "startIndex": ini, "endIndex": fim}
+        req = {"range": rng}
+        if tipo == "insertDimension": req["inheritFromBefore"] = ini > 0
+        requests.append({tipo: req})
+
+    def _remover_antigos_ate(aba_parada):
+        # Meses antigos antes de 'aba_parada' já não têm bloco (aba apagada ou vazia)
+        while fila_antigos and fila_antigos[0][0] != aba_parada:
+            _, b = fila_antigos.pop(0)
+            if b["linhas"]: _dimensao("deleteDimension", cursor, cursor + b["linhas"])
+
+    # insertDimension não pode começar além da grade: garante uma linha de folga antes do primeiro
+    folga = 2 + sum(b["linhas"] for b in meta["blocos"].values()) - ws_final.row_count
+    cursor = 1 # índice 0-based da próxima linha de bloco (linha 0 = cabeçalho)
+    for b in blocos:
+        if b['aba'] in meta["blocos"]:
+            _remover_antigos_ate(b['aba'])
+            fila_antigos.pop(0)
+            n_antigo = meta["blocos"][b['aba']]["linhas"]
+        else:
+            n_antigo = 0
+        if b['alterado']:
+            n_novo = b['linhas']
+            if n_novo > n_antigo:
+                if folga > 0:
+                    requests.append({"appendDimension": {"sheetId": ws_final.id, "dimension": "ROWS", "length": folga}})
+                    folga = 0
+                _dimensao("insertDimension", cursor + n_antigo, cursor + n_novo)
+            elif n_novo < n_antigo: _dimensao("deleteDimension", cursor + n_novo, cursor + n_antigo)
+            if requests:
+                ws_final.spreadsheet.batch_update({"requests": requests})
+                requests = []
+            ini = gspread.utils.rowcol_to_a1(cursor + 1, 1)
+            fim = gspread.utils.rowcol_to_a1(cursor + n_novo, len(cabecalho))
+            escrever_dados_em_lotes(ws_final, [{'range': f"{ini}:{fim}", 'values': _linhas_bloco(b['df'], cabecalho)}])
+        cursor += b['linhas']
+        yield b
+    _remover_antigos_ate(None)
+    if requests: ws_final.spreadsheet.batch_update({"requests": requests})
+
+def _espelhar_consolidada(blocos, cabecalho, blocos_meta=None):
+    """
+    Último estágio (é ele que puxa o fluxo): espelho local da aba consolidada. Com o meta anterior
+    troca só os blocos alterados e apaga os meses que saíram; sem ele regrava a aba inteira.
+    """
+    if blocos_meta is None:
+        espelho_local.gravar_aba_em_partes(PLANILHA_CONSOLIDADA_NOME, cabecalho, (b['df'] for b in blocos))
+        return
+    presentes = []
+    def _alterados():
+        for b in blocos:
+            presentes.append(b['aba'])
+            if b['alterado']: yield f"Snapshot: {b['aba']}", b['df'].reindex(columns=cabecalho, fill_value='')
+    # Lido só depois dos blocos, quando já se sabe quais meses saíram
+    saiu = (f"Snapshot: {aba}" for aba in blocos_meta if aba not in presentes)
+    espelho_local.substituir_blocos(PLANILHA_CONSOLIDADA_NOME, 'Fonte_Dados', _alterados(), saiu)
+
+def consolidar_geral_para_dashboard():
+    """
+    Consolida TODAS as abas de MESES em um 'Mapa Histórico'.
+    Lógica: EMPILHAMENTO SIMPLES (SNAPSHOT).
+    - Ignora datas (assume que se está na aba do mês, pertence àquele histórico).
+    - Permite repetições (mesma tarefa pode aparecer em Nov e Dez para mostrar evolução).
+    - Remove [ARCHIVED] para limpeza.
+    - Incremental: só reprocessa/regrava os meses cujo fingerprint mudou desde a última
+      consolidação (ver 'ConsolidacaoMeta'). Mudança de colunas => reconstrução completa.
+    - Em fluxo: os meses são lidos em janelas de ABAS_POR_JANELA abas (até LEITORES_PARALELOS
+      janelas em paralelo) e cada um é limpo, serializado e gravado (planilha e espelho local); a
+      memória fica limitada por essas janelas, não pelo histórico inteiro.
+    - A reconstrução completa regrava a própria aba consolidada (o sheetId não muda) e o meta é
+      invalidado antes da primeira escrita: uma falha no meio força a reconstrução na próxima vez.
+    """
+    spreadsheet = obter_spreadsheet_cacheada()
+    abas = {ws.title: ws for ws in spreadsheet.worksheets()}
+    # Ordem cronológica (não a das abas na planilha): o consolidado sai igual em toda execução
+    abas_meses = sorted((t for t in abas if extrair_mes_ano_da_aba(t)), key=lambda t: extrair_mes_ano_da_aba(t)[::-1])
+    # Abas de mês lidas e consolidada/meta gravadas sem outra ação escrevendo nelas no meio
+    with travar_abas(abas_meses + [PLANILHA_CONSOLIDADA_NOME, PLANILHA_META_CONSOLIDACAO_NOME]):
+        return _consolidar_meses(spreadsheet, abas, abas_meses)
+
+def _consolidar_meses(spreadsheet, abas, abas_meses):
+    ws_final = abas.get(PLANILHA_CONSOLIDADA_NOME)
+    meta = _ler_meta_consolidacao(spreadsheet) if ws_final is not None else None
+    blocos_meta = meta["blocos"] if meta else {}
+
+    # Cabeçalho final antes dos dados: só a linha 1 de cada aba de mês, numa chamada
+    try: cabecalhos = ler_cabecalhos(spreadsheet, abas_meses, forcar=True)
+    except Exception as e: return f"Erro ao ler as abas: {e}"
+    cols_drop = obter_lista_colunas_para_remover(spreadsheet)
+    cabecalho = []
+    for titulo in abas_meses:
+        if not cabecalhos[titulo]: continue
+        cabecalho.extend(c for c in _colunas_bloco([cabecalhos[titulo]]) if c not in cabecalho and c not in cols_drop)
+    if not cabecalho: return "Nenhum dado (aba mensal) encontrado para consolidar."
+    assinatura = hashlib.sha1("\x1f".join(cabecalho).encode('utf-8')).hexdigest()
+
+    # Incremental só se o meta vale para esta aba e os meses mantidos continuam na mesma ordem
+    presentes = set(abas_meses)
+    mantidos_antes = [aba for aba, _ in sorted(blocos_meta.items(), key=lambda kv: kv[1]["inicio"]) if aba in presentes]
+    incremental = (ws_final is not None and meta is not None and meta["cabecalho"] == assinatura
+                   and mantidos_antes == [t for t in abas_meses if t in blocos_meta]
+                   and _meta_confere_com_aba(ws_final, cabecalho, meta))
+    # Espelho com outras colunas (ou sem a aba) é regravado inteiro: todos os meses passam pela limpeza
+    espelho_parcial = incremental and espelho_local.colunas_aba(PLANILHA_CONSOLIDADA_NOME) == cabecalho
+
+    gravados = [] # blocos que já passaram pelo fluxo, sem o DataFrame
+    def _registrar(fluxo):
+        for b in fluxo:
+            yield b
+            b['df'] = None
+            gravados.append(b)
+
+    try:
+        progresso = "Gravando os meses alterados" if incremental else "Reconstruindo a aba consolidada"
+        blocos = _blocos_em_fluxo(_ler_meses_em_fluxo(spreadsheet, abas_meses), blocos_meta, not espelho_parcial, progresso)
+        # Sem nenhum bloco nada é gravado: aba consolidada, meta e espelho ficam como estão
+        primeiro = next(blocos, None)
+        if primeiro is None: return "Nenhum dado (aba mensal) encontrado para consolidar."
+        blocos = itertools.chain([primeiro], blocos)
+        # O índice da consolidada não acompanha a troca de blocos: a próxima deleção reindexa a aba
+        registrar_indice_ids(PLANILHA_CONSOLIDADA_NOME, None)
+        if incremental:
+            fluxo = _gravar_blocos_alterados(ws_final, cabecalho, blocos, meta)
+        else:
+            if meta is not None: _invalidar_meta_consolidacao(spreadsheet)
+            if ws_final is None:
+                ws_final = spreadsheet.add_worksheet(title=PLANILHA_CONSOLIDADA_NOME, rows=1, cols=len(cabecalho))
+            fluxo = _gravar_consolidada_do_zero(ws_final, cabecalho, blocos)
+        with etapa("consolidar em fluxo") as medicao:
+            _espelhar_consolidada(_registrar(fluxo), cabecalho, blocos_meta if espelho_parcial else None)
+            medicao.linhas_saida = sum(b['linhas'] for b in gravados)
+
+        _gravar_meta_consolidacao(spreadsheet, assinatura, gravados)
+
+        total = sum(b['linhas'] for b in gravados)
+        alterados = sum(1 for b in gravados if b['alterado'])
+        detalhe = f"{alterados} mês(es) regravado(s)" if incremental else "reconstrução completa"
+        return f"Sucesso! {total} tarefas consolidadas (snapshots) na aba '{PLANILHA_CONSOLIDADA_NOME}' ({detalhe})."
+    except Exception as e: return f"Erro ao consolidar: {e}"
+
+@medido()
+def serie_historico_semanal(df_src, hoje=None):
+    """
+    Série diária do gráfico (Data, Total_Fechadas, Total_Tarefas) para todas as semanas citadas na 'Lista',
+    em uma passada (groupby semana x Data Final). IGNORA tarefas arquivadas.
+    Em cada dia: total = tarefas da semana do dia; fechadas = tarefas da semana com 'Data Final' até
+    aquele dia (datas futuras contam como hoje, como no snapshot manual).
+    """
+    hoje = pd.Timestamp.now().normalize() if hoje is None else pd.Timestamp(hoje).normalize()
+    semana_hoje = hoje - timedelta(days=hoje.dayofweek)
+    df = df_src[~df_src[COL_ARQUIVADA] & (df_src[COL_SEMANA_INICIO] <= hoje)] if not df_src.empty else df_src
+    semanas = df[COL_SEMANA_INICIO].astype('datetime64[ns]') if not df.empty else pd.Series(dtype='datetime64[ns]')
+    if COL_DATA_FINAL in df.columns: fim = df[COL_DATA_FINAL].astype('datetime64[ns]').dt.normalize().clip(upper=hoje)
+    else: fim = pd.Series(pd.NaT, index=df.index, dtype='datetime64[ns]')
+
+    contagem = pd.DataFrame({"semana": semanas, "fim": fim}).groupby(["semana", "fim"], dropna=False).size().reset_index(name="n")
+    totais = contagem.groupby("semana")["n"].sum()
+    fechadas = contagem.dropna(subset=["fim"]).sort_values("fim", kind="stable")
+    fechadas["acumulado"] = fechadas.groupby("semana")["n"].cumsum()
+
+    inicios = totais.index.to_numpy(dtype='datetime64[ns]')
+    dias = pd.DataFrame({"semana": np.repeat(inicios, DIAS_HISTORICO_POR_SEMANA)})
+    dias["Data"] = dias["semana"] + pd.to_timedelta(np.tile(np.arange(DIAS_HISTORICO_POR_SEMANA), len(inicios)), unit="D")
+    dias = dias[dias["Data"] <= hoje]
+    if not (dias["Data"] == hoje).any():
+        dias = pd.concat([dias, pd.DataFrame({"semana": [semana_hoje], "Data": [hoje]}).astype('datetime64[ns]')], ignore_index=True)
+
+    dias = pd.merge_asof(dias.sort_values("Data"), fechadas[["fim", "semana", "acumulado"]], left_on="Data", right_on="fim",
+                         by="semana")
+    dias["Total_Fechadas"] = dias["acumulado"].fillna(0).astype(int)
+    dias["Total_Tarefas"] = dias["semana"].map(totais).fillna(0).astype(int)
+    return dias[CABECALHO_HISTORICO].reset_index(drop=True)
+
+def atualizar_historico_diario(reescrever=False):
+    """
+    Atualiza a aba 'HistoricoDiario' com a série de todas as semanas (serie_historico_semanal):
+    dias que faltam (quem esqueceu do snapshot) são preenchidos e o dia de hoje é sempre regravado.
+    Pontos já gravados em outros dias são mantidos (reescrever=True recalcula todos).
+    Uma leitura da aba, índice data -> linha em memória e uma escrita em lote só das linhas que mudaram.
+    """
+    try:
+        hoje = pd.Timestamp.now().normalize()
+        data_ref_lista_str = (hoje - timedelta(days=hoje.dayofweek)).strftime('%d/%m/%Y')
+        
+        spreadsheet = obter_spreadsheet_cacheada()
+        
+        try: 
+            # Só 'Lista' e 'Data Final' (ou o snapshot completo, se já estiver em memória)
+            df_src, _ = obter_origem_colunas(spreadsheet, ['Lista', 'Data Final'])
+        except: return f"Aba '{PLANILHA_ORIGEM_NOME}' não encontrada."
+        
+        if df_src.empty: return "Aba de origem vazia."
+
+        if 'Lista' not in df_src.columns: return "Coluna 'Lista' ausente."
+
+        serie = serie_historico_semanal(df_src, hoje)
+        
+        with travar_abas([PLANILHA_HISTORICO_NOME]): # da leitura da aba à escrita das linhas
+            try:
+                ws_hist = spreadsheet.worksheet(PLANILHA_HISTORICO_NOME)
+                atuais = ler_valores_aba(ws_hist) or []
+            except:
+                ws_hist = spreadsheet.add_worksheet(title=PLANILHA_HISTORICO_NOME, rows=len(serie) + 1, cols=3)
+                atuais = []
+
+            # Índice data -> linha gravada (linhas com data ilegível ficam no fim, como estão)
+            linhas_atuais = [(list(l[:3]) + [''] * 3)[:3] for l in atuais[1:]]
+            datas = conversao_datas.converter_data_robusta(pd.Series([l[0] for l in linhas_atuais], dtype=object))
+            por_data = {d: l for d, l in zip(datas, linhas_atuais) if pd.notna(d)}
+            sem_data = [l for d, l in zip(datas, linhas_atuais) if pd.isna(d) and any(l)]
+            preenchidas = 0
+            for d, fechadas, total in serie.itertuples(index=False):
+                if reescrever or d == hoje or d not in por_data:
+                    preenchidas += d not in por_data
+                    por_data[d] = [d.strftime('%d/%m/%Y'), str(fechadas), str(total)]
+            valores = [CABECALHO_HISTORICO] + [por_data[d] for d in sorted(por_data)] + sem_data
+            valores += [[''] * 3] * (len(atuais) - len(valores)) # datas repetidas na aba: limpa as sobras
+
+            # Só as linhas diferentes do que já está na aba (cabeçalho incluído)
+            mudaram = [i + 1 for i, l in enumerate(valores) if i >= len(atuais) or (list(atuais[i][:3]) + [''] * 3)[:3] != l]
+            if len(valores) > ws_hist.row_count: ws_hist.add_rows(len(valores) - ws_hist.row_count)
+            dados = [{'range': f"A{ini}:C{fim}", 'values': valores[ini - 1:fim]} for ini, fim in _intervalos_contiguos(mudaram)]
+            escrever_dados_em_lotes(ws_hist, dados)
+
+        ponto = serie[serie["Data"] == hoje].iloc[0]
+        fechadas_sem, total_sem = int(ponto["Total_Fechadas"]), int(ponto["Total_Tarefas"])
+        reportar(f"Gravando '{PLANILHA_HISTORICO_NOME}'", fechadas=fechadas_sem, total=total_sem, dias_preenchidos=preenchidas)
+        return f"OK! Semana {data_ref_lista_str}: {fechadas_sem}/{total_sem} ({preenchidas} dia(s) preenchido(s))"
+        
+    except Exception as e: return f"Erro: {e}"
+
+def deletar_tarefa_global(id_del):
+    """Apaga um ID em todas as abas (ver deletar_tarefas_global). True se alguma linha foi removida."""
+    try: return bool(deletar_tarefas_global([id_del]))
+    except: return False
@@ -0,0 +1,216 @@
+# ==============================================================================
+# PERFIL DE DESEMPENHO DAS AÇÕES
+# ==============================================================================
+# Instrumentação leve: cada ação roda dentro de perfilar_acao(nome) e os trechos
+# interessantes (leituras, escritas, transformações) dentro de etapa(nome). Cada
+# etapa guarda tempo de parede, chamadas à API (leitura/escrita), retentativas,
+# bytes recebidos, células transferidas e linhas de entrada/saída.
+# As chamadas chegam por registrar_chamada / registrar_retentativa, feitas pelo
+# cliente HTTP com cota (cota_sheets) e pela planilha falsa (armazenamento).
+# Chamadas, retentativas e bytes de uma etapa incluem os das etapas internas;
+# células e linhas são só da própria etapa.
+# A pilha de etapas abertas é por thread; pools de threads usam propagar(func)
+# para que o trabalho feito nos workers conte na etapa (e na cota) de quem os criou.
+# Fora de uma ação perfilada, etapa() e registrar_*() não fazem nada.
+# Nada aqui importa o Streamlit (nem pandas).
+import csv
+import io
+import json
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+from functools import wraps
+
+PERFIS_GUARDADOS = 20 # ações mais recentes mantidas para o painel/exportação
+ETAPAS_POR_PERFIL = 500 # etapas registradas por ação (o resto é contado, não listado)
+
+CAMPOS_ETAPA = ["segundos", "leituras", "escritas", "retentativas", "bytes_recebidos", "celulas",
+                "linhas_entrada", "linhas_saida"]
+
+_contexto = threading.local()
+_lock = threading.Lock()
+_perfis = deque(maxlen=PERFIS_GUARDADOS)
+
+
+class Etapa:
+    """Medição de um trecho. Atribua linhas_entrada/linhas_saida/celulas durante o bloco, se fizer sentido."""
+
+    def __init__(self, perfil, nome, profundidade, linhas_entrada=None):
+        self.perfil = perfil
+        self.nome = nome
+        self.profundidade = profundidade
+        self.inicio = time.perf_counter()
+        self.segundos = None
+        self.leituras = 0
+        self.escritas = 0
+        self.retentativas = 0
+        self.bytes_recebidos = 0
+        self.celulas = 0
+        self.linhas_entrada = linhas_entrada
+        self.linhas_saida = None
+
+    def somar(self, **valores):
+        with self.perfil.lock:
+            for campo, valor in valores.items(): setattr(self, campo, (getattr(self, campo) or 0) + valor)
+
+    def como_dict(self):
+        return {"etapa": self.nome, "profundidade": self.profundidade,
+                **{c: getattr(self, c) for c in CAMPOS_ETAPA}}
+
+
+class _EtapaNula:
+    """Devolvida por etapa() fora de uma ação perfilada: aceita as mesmas operações e descarta."""
+
+    def somar(self, **valores): pass
+
+    def __getattr__(self, campo): return 0
+
+    def __setattr__(self, campo, valor): pass
+
+
+_ETAPA_NULA = _EtapaNula()
+
+
+class PerfilAcao:
+    def __init__(self, nome):
+        self.nome = nome
+        self.iniciada_em = datetime.now().strftime('%d/%m/%Y %H:%M:%S')
+        self.lock = threading.Lock()
+        self.raiz = Etapa(self, nome, 0)
+        self.etapas = [self.raiz]
+        self.descartadas = 0
+        self.resultado = None
+        self.uso_cota = {}
+
+    def nova_etapa(self, nome, profundidade, linhas_entrada=None):
+        etapa = Etapa(self, nome, profundidade, linhas_entrada)
+        with self.lock:
+            if len(self.etapas) < ETAPAS_POR_PERFIL: self.etapas.append(etapa)
+            else: self.descartadas += 1
+        return etapa
+
+    def como_dict(self):
+        with self.lock: etapas = list(self.etapas)
+        return {"acao": self.nome, "iniciada_em": self.iniciada_em, "resultado": self.resultado,
+                "etapas_descartadas": self.descartadas, "uso_cota": dict(self.uso_cota),
+                "etapas": [e.como_dict() for e in etapas]}
+
+
+def _pilha():
+    if not hasattr(_contexto, "pilha"): _contexto.pilha = []
+    return _contexto.pilha
+
+
+@contextmanager
+def perfilar_acao(nome):
+    """
+    Mede uma ação inteira (e o consumo de cota, via cota_sheets.medir_uso_cota). O perfil fica
+    guardado para listar_perfis() ao final, mesmo se a ação falhar.
+    """
+    from cota_sheets import medir_uso_cota # cota_sheets importa este módulo
+    perfil = PerfilAcao(nome)
+    pilha_anterior = _pilha()
+    _contexto.pilha = [perfil.raiz]
+    try:
+        with medir_uso_cota(nome) as uso: yield perfil
+    finally:
+        _contexto.pilha = pilha_anterior
+        perfil.raiz.segundos = round(time.perf_counter() - perfil.raiz.inicio, 3)
+        perfil.uso_cota = uso
+        with _lock: _perfis.append(perfil)
+
+
+@contextmanager
+def etapa(nome, linhas_entrada=None):
+    """Mede um trecho dentro da ação corrente: 'with etapa("ler origem") as e: ...; e.linhas_saida = len(df)'."""
+    pilha = _pilha()
+    if not pilha:
+        yield _ETAPA_NULA
+        return
+    atual = pilha[-1].perfil.nova_etapa(nome, len(pilha), linhas_entrada)
+    pilha.append(atual)
+    try: yield atual
+    finally:
+        pilha.pop()
+        atual.segundos = round(time.perf_counter() - atual.inicio, 3)
+
+
+def medido(nome=None):
+    """Decorador: a função inteira vira uma etapa (com o nome dela, se 'nome' não for dado)."""
+    def decorar(func):
+        @wraps(func)
+        def envolvida(*args, **kwargs):
+            if not _pilha(): return func(*args, **kwargs)
+            with etapa(nome or func.__name__): return func(*args, **kwargs)
+        return envolvida
+    return decorar
+
+
+def propagar(func):
+    """
+    Envolve func para rodar em outra thread contando nas etapas abertas agora nesta thread
+    (e na medição de cota da ação, cota_sheets.medir_uso_cota).
+    """
+    from cota_sheets import propagar as propagar_cota # cota_sheets importa este módulo
+    func = propagar_cota(func)
+    pilha = list(_pilha())
+    if not pilha: return func
+
+    @wraps(func)
+    def envolvida(*args, **kwargs):
+        anterior = _pilha()
+        _contexto.pilha = list(pilha)
+        try: return func(*args, **kwargs)
+        finally: _contexto.pilha = anterior
+    return envolvida
+
+
+def _somar_na_pilha(**valores):
+    for aberta in _pilha(): aberta.somar(**valores)
+
+
+def registrar_chamada(tipo, bytes_recebidos=0):
+    """Uma chamada à API ('leitura' ou 'escrita') feita pela thread atual."""
+    _somar_na_pilha(**{"leituras" if tipo == "leitura" else "escritas": 1, "bytes_recebidos": bytes_recebidos})
+
+
+def registrar_retentativa():
+    _somar_na_pilha(retentativas=1)
+
+
+def contar_celulas(valores):
+    """Células de uma lista de linhas (formato de get_all_values / values)."""
+    return sum(len(l) for l in valores) if valores else 0
+
+
+def listar_perfis():
+    """Perfis guardados, do mais recente para o mais antigo (como dicts)."""
+    with _lock: perfis = list(_perfis)
+    return [p.como_dict() for p in reversed(perfis)]
+
+
+def limpar_perfis():
+    with _lock: _perfis.clear()
+
+
+def exportar_json(perfis=None):
+    return json.dumps(listar_perfis() if perfis is None else perfis, ensure_ascii=False, indent=2)
+
+
+def exportar_csv(perfis=None):
+    """Uma linha por etapa, com a ação e o horário em que ela começou."""
+    saida = io.StringIO()
+    escritor = csv.DictWriter(saida, fieldnames=["acao", "iniciada_em", "etapa", "profundidade"] + CAMPOS_ETAPA)
+    escritor.writeheader()
+    for perfil in listar_perfis() if perfis is None else perfis:
+        for linha in perfil["etapas"]:
+            escritor.writerow({"acao": perfil["acao"], "iniciada_em": perfil["iniciada_em"], **linha})
+    return saida.getvalue()
+
+
+def gravar_perfis(caminho, perfis=None):
+    """Grava em JSON ou CSV (pela extensão do arquivo)."""
+    texto = exportar_csv(perfis) if caminho.lower().endswith(".csv") else exportar_json(perfis)
+    with open(caminho, 'w', encoding='utf-8', newline='') as f: f.write(texto)
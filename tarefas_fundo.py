@@ -0,0 +1,124 @@
+# ==============================================================================
+# TAREFAS EM SEGUNDO PLANO (AÇÕES DO EDITOR)
+# ==============================================================================
+# As ações longas (sincronizar mês, consolidar, snapshot do histórico, backlog)
+# rodam num pool de threads que vive no processo, fora da execução do script do
+# Streamlit: um rerun ou a troca de página não interrompe o trabalho. A tela só
+# consulta o estado das tarefas (etapa atual, detalhes, resultado).
+# Dentro de uma tarefa, reportar(etapa, **detalhes) atualiza o progresso; fora
+# de uma tarefa (uso direto, benchmark) é um no-op.
+# Nada aqui importa o Streamlit.
+import itertools
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+TAREFAS_SIMULTANEAS = 2 # ações rodando ao mesmo tempo (as demais esperam na fila)
+TAREFAS_NO_HISTORICO = 20 # tarefas encerradas mantidas para consulta
+EVENTOS_POR_TAREFA = 200
+
+_contexto = threading.local()
+
+
+class Tarefa:
+    """Estado de uma ação submetida. Leia com instantaneo() (cópia consistente)."""
+
+    def __init__(self, id_tarefa, nome, chave):
+        self.id = id_tarefa
+        self.nome = nome
+        self.chave = chave
+        self.status = "na fila" # na fila | rodando | concluída | erro
+        self.etapa = ""
+        self.detalhes = {}
+        self.eventos = []
+        self.resultado = None
+        self.criada_em = time.time()
+        self.inicio = None
+        self.fim = None
+        self.lock = threading.Lock()
+
+    @property
+    def ativa(self):
+        return self.status in ("na fila", "rodando")
+
+    def reportar(self, etapa, **detalhes):
+        with self.lock:
+            if etapa != self.etapa: self.detalhes = {}
+            self.etapa = etapa
+            self.detalhes.update(detalhes)
+            self.eventos.append((time.time(), etapa, dict(detalhes)))
+            del self.eventos[:-EVENTOS_POR_TAREFA]
+
+    def instantaneo(self):
+        with self.lock:
+            agora = self.fim or time.time()
+            return {"id": self.id, "nome": self.nome, "status": self.status, "etapa": self.etapa,
+                    "detalhes": dict(self.detalhes), "resultado": self.resultado,
+                    "segundos": round(agora - self.inicio, 1) if self.inicio else 0.0,
+                    "eventos": list(self.eventos)}
+
+
+class ExecutorTarefas:
+    """Pool de threads + registro das tarefas. Uma tarefa ativa por chave: submeter de novo reconecta."""
+
+    def __init__(self, max_simultaneas=TAREFAS_SIMULTANEAS):
+        self.pool = ThreadPoolExecutor(max_workers=max_simultaneas, thread_name_prefix="tarefa")
+        self.lock = threading.Lock()
+        self.tarefas = {} # id -> Tarefa (ordem de criação)
+        self._ids = itertools.count(1)
+
+    def submeter(self, nome, func, chave=None):
+        """
+        Agenda func() e devolve a Tarefa. Se já houver tarefa ativa com a mesma 'chave'
+        (padrão: o nome), devolve essa em vez de começar outra.
+        """
+        chave = chave or nome
+        with self.lock:
+            for tarefa in self.tarefas.values():
+                if tarefa.chave == chave and tarefa.ativa: return tarefa
+            tarefa = Tarefa(next(self._ids), nome, chave)
+            self.tarefas[tarefa.id] = tarefa
+            self._podar()
+        self.pool.submit(self._rodar, tarefa, func)
+        return tarefa
+
+    def _rodar(self, tarefa, func):
+        with tarefa.lock:
+            tarefa.status = "rodando"; tarefa.inicio = time.time()
+        _contexto.tarefa = tarefa
+        try:
+            resultado = func()
+            status = "concluída"
+        except Exception as e:
+            logger.exception("Tarefa '%s' falhou", tarefa.nome)
+            resultado = f"Erro: {e}"; status = "erro"
+        finally:
+            _contexto.tarefa = None
+        with tarefa.lock:
+            tarefa.resultado = resultado; tarefa.status = status; tarefa.fim = time.time()
+
+    def _podar(self):
+        encerradas = [t for t in self.tarefas.values() if not t.ativa]
+        for t in encerradas[:max(0, len(encerradas) - TAREFAS_NO_HISTORICO)]: del self.tarefas[t.id]
+
+    def obter(self, id_tarefa):
+        with self.lock: return self.tarefas.get(id_tarefa)
+
+    def listar(self):
+        """Tarefas, mais recentes primeiro."""
+        with self.lock: return list(reversed(self.tarefas.values()))
+
+    def ativas(self):
+        return [t for t in self.listar() if t.ativa]
+
+
+EXECUTOR = ExecutorTarefas()
+
+
+def reportar(etapa, **detalhes):
+    """Atualiza o progresso da tarefa que está rodando nesta thread (no-op fora de tarefas)."""
+    tarefa = getattr(_contexto, "tarefa", None)
+    if tarefa is not None: tarefa.reportar(etapa, **detalhes)
@@ -0,0 +1,339 @@
+# ==============================================================================
+# VERIFICAÇÕES DE REGRESSÃO DO MOTOR (PLANILHA FALSA)
+# ==============================================================================
+# Roda cenários do motor (motor_planilha) contra uma armazenamento.PlanilhaMemoria
+# gerada pelo benchmark e confere o resultado, não o tempo:
+# - consolidação incremental == reconstrução do zero, com meta e espelho coerentes;
+# - escrita diferencial (escrever_aba_incremental) == reescrita completa;
+# - deleção com linhas incluídas fora do app;
+# - falha de leitura no meio da reconstrução (mesma aba, só o layout novo, meta invalidado)
+#   e meses sem linhas (nada é gravado);
+# - concorrência: sincronização e deleção na mesma aba; cota medida por ação;
+# - série do histórico semanal (serie_historico_semanal) num quadro montado à mão;
+# - conversão de datas ISO/BR (conversao_datas.analisar_datas), inclusive os inválidos.
+# Imprime OK/FALHA por verificação e sai com código 1 se alguma falhar.
+#
+# Uso:
+#   python verificar_planilha.py
+#   python verificar_planilha.py --linhas 5000 --meses 8
+#   python verificar_planilha.py --so delecao concorrencia
+import argparse
+import sys
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+import benchmark_planilha # antes do motor: aponta o espelho local para um diretório temporário
+import armazenamento
+import conversao_datas
+import cota_sheets
+import espelho_local
+import motor_planilha as g
+import perfil_acoes
+
+C = g.PLANILHA_CONSOLIDADA_NOME
+
+
+class Falha(Exception):
+    pass
+
+
+def _conferir(condicao, mensagem):
+    if not condicao: raise Falha(mensagem)
+
+
+def _planilha(n_linhas, n_meses):
+    planilha = benchmark_planilha.gerar_planilha(n_linhas, n_meses)
+    armazenamento.definir_planilha(planilha)
+    g.invalidar_snapshot_origem()
+    return planilha
+
+
+def _meses(planilha):
+    return sorted((t for t in planilha.abas if g.extrair_mes_ano_da_aba(t)), key=lambda t: g.extrair_mes_ano_da_aba(t)[::-1])
+
+
+def _ids(planilha, titulo):
+    valores = planilha.abas[titulo].get_all_values()
+    col = valores[0].index('Link')
+    return [l[col].split('/')[-1] for l in valores[1:]]
+
+
+def _conferir_consolidada(planilha, cenario):
+    """Meta e espelho batem com a aba consolidada, e a aba é igual à de uma reconstrução do zero."""
+    valores = planilha.abas[C].get_all_values()
+    meta = g._ler_meta_consolidacao(planilha)
+    _conferir(meta is not None and g._meta_confere_com_aba(planilha.abas[C], valores[0], meta),
+              f"{cenario}: meta não confere com a aba consolidada")
+    espelho = espelho_local.ler_aba(C)
+    _conferir(espelho is not None and list(espelho.columns) == valores[0], f"{cenario}: colunas do espelho")
+    _conferir(sorted(espelho.astype(str).values.tolist()) == sorted(valores[1:]), f"{cenario}: linhas do espelho")
+    del planilha.abas[g.PLANILHA_META_CONSOLIDACAO_NOME] # sem meta => reconstrução completa
+    r = g.consolidar_geral_para_dashboard()
+    _conferir("reconstrução completa" in r, f"{cenario}: reconstrução falhou ({r})")
+    _conferir(planilha.abas[C].get_all_values() == valores, f"{cenario}: incremental difere da reconstrução do zero")
+
+
+# ------------------------------------------------------------------------------
+# Verificações
+# ------------------------------------------------------------------------------
+def verificar_consolidacao(n_linhas, n_meses):
+    p = _planilha(n_linhas, n_meses)
+    r = g.consolidar_geral_para_dashboard()
+    _conferir(r.startswith("Sucesso!"), f"primeira consolidação: {r}")
+    meses = _meses(p)
+    _conferir(len(meses) >= 4, "poucas abas de mês para os cenários (aumente --meses)")
+
+    def crescer(aba):
+        aba.celulas.extend([list(l) for l in aba.celulas[1:51]]); aba.celulas[3][0] = 'alterada'
+        aba.row_count = max(aba.row_count, len(aba.celulas))
+
+    cenarios = [
+        ("sem mudança", lambda: None, "0 mês(es)"),
+        ("mês cresce", lambda: crescer(p.abas[meses[1]]), "1 mês(es)"),
+        ("mês encolhe", lambda: p.abas[meses[2]].celulas.__delitem__(slice(20, None)), "1 mês(es)"),
+        ("mês apagado", lambda: p.abas.pop(meses[0]), "0 mês(es)"),
+        ("mês esvaziado", lambda: p.abas[meses[3]].celulas.__delitem__(slice(1, None)), "0 mês(es)"),
+        ("coluna nova", lambda: [l.append('x' if i else 'Extra') for i, l in enumerate(p.abas[meses[-1]].celulas)],
+         "reconstrução completa"),
+    ]
+    for nome, alterar, esperado in cenarios:
+        alterar()
+        r = g.consolidar_geral_para_dashboard()
+        _conferir(esperado in r, f"{nome}: esperado '{esperado}', veio '{r}'")
+        _conferir_consolidada(p, nome)
+    return f"{len(cenarios)} cenários"
+
+
+def verificar_escrita_diferencial(n_linhas, n_meses):
+    p = _planilha(0, 1)
+    diferencial = p.criar_aba("Diferencial", []); completa = p.criar_aba("Completa", [])
+    base = pd.DataFrame({"ID": [str(i) for i in range(n_linhas)], "V": [f"v{i}" for i in range(n_linhas)]})
+    g.escrever_aba_incremental(diferencial, base)
+    for rodada, semente in enumerate(range(5)):
+        df = base.sample(frac=0.9, random_state=semente)
+        df = pd.concat([df, pd.DataFrame({"ID": [f"n{rodada}-{i}" for i in range(30)], "V": "nova"})])
+        df.loc[df.index[:10], "V"] = f"mudou{rodada}"
+        r = g.escrever_aba_incremental(diferencial, df)
+        g.reescrever_aba_completa(completa, g.valores_do_dataframe(df))
+        a = diferencial.get_all_values(); b = completa.get_all_values()
+        _conferir(a[0] == b[0] and sorted(a[1:]) == sorted(b[1:]), f"rodada {rodada} ({r['modo']}): abas diferentes")
+        _conferir(r["modo"] == "diferencial", f"rodada {rodada}: esperado modo diferencial, veio {r['modo']}")
+    return "5 rodadas"
+
+
+def verificar_delecao(n_linhas, n_meses):
+    p = _planilha(n_linhas, n_meses)
+    g.sincronizar_basecamp_com_mes_especifico(g.obter_nome_aba_mes_atual())
+    g.consolidar_geral_para_dashboard()
+    mes = _meses(p)[-1]
+    g.indexar_abas(p, list(p.abas)) # índice "quente" antes da edição externa
+    # Linha com o mesmo ID anexada direto na planilha: as linhas já indexadas continuam no lugar
+    aba = p.abas[mes]; col = aba.celulas[0].index('Link')
+    alvo = _ids(p, mes)[5]
+    copia = next(l for l in aba.celulas[1:] if l[col].split('/')[-1] == alvo)
+    aba.celulas.append(list(copia)); aba.row_count = max(aba.row_count, len(aba.celulas))
+    antes = {t: _ids(p, t) for t in p.abas if t == C or t == g.PLANILHA_ORIGEM_NOME or g.extrair_mes_ano_da_aba(t)}
+    g.deletar_tarefas_global([alvo])
+    for titulo, ids in antes.items():
+        _conferir(_ids(p, titulo) == [i for i in ids if i != alvo], f"'{titulo}': linhas do ID não foram todas removidas")
+    meta = g._ler_meta_consolidacao(p)
+    _conferir(meta is not None and g._meta_confere_com_aba(p.abas[C], p.abas[C].get_all_values()[0], meta),
+              "meta desalinhado depois da deleção")
+    return f"ID em {sum(alvo in ids for ids in antes.values())} abas"
+
+
+def verificar_falha_na_reconstrucao(n_linhas, n_meses):
+    p = _planilha(n_linhas, n_meses)
+    g.consolidar_geral_para_dashboard()
+    id_aba = p.abas[C].id; ordem = list(p.abas)
+    valores = p.abas[C].get_all_values(); espelho = espelho_local.ler_aba(C).values.tolist()
+    # Todos os meses só com cabeçalho: nada é gravado (nem aba consolidada, nem meta)
+    meses = _meses(p); guardados = {t: p.abas[t].celulas for t in meses}
+    for t in meses: p.abas[t].celulas = guardados[t][:1]
+    meta = g._ler_meta_consolidacao(p)
+    try: r = g.consolidar_geral_para_dashboard()
+    finally:
+        for t in meses: p.abas[t].celulas = guardados[t]
+    _conferir(r.startswith("Nenhum dado"), f"meses vazios: {r}")
+    _conferir(p.abas[C].get_all_values() == valores and g._ler_meta_consolidacao(p) == meta,
+              "meses vazios alteraram a aba consolidada ou o meta")
+
+    # Coluna nova no primeiro mês: reconstrução com outro layout, em lotes pequenos, que falha na
+    # leitura do último mês (depois de alguns lotes já gravados)
+    for i, linha in enumerate(p.abas[meses[0]].celulas): linha.append('x' if i else 'Extra')
+    alvo = meses[-1]
+    original = p.values_batch_get; lote = g.CELULAS_POR_LOTE_ESCRITA
+    def falhar(ranges, params=None):
+        if f"'{alvo}'" in ranges: raise RuntimeError("falha simulada de rede")
+        return original(ranges, params)
+    p.values_batch_get = falhar; g.CELULAS_POR_LOTE_ESCRITA = 1_000
+    try: r = g.consolidar_geral_para_dashboard()
+    finally: p.values_batch_get = original; g.CELULAS_POR_LOTE_ESCRITA = lote
+    _conferir(r.startswith("Erro") and "falha simulada" in r, f"a falha não chegou ao resultado: {r}")
+    parcial = p.abas[C].get_all_values()
+    _conferir(p.abas[C].id == id_aba and list(p.abas) == ordem, "aba consolidada trocada (sheetId ou posição)")
+    _conferir(len(parcial) > 1 and 'Extra' in parcial[0], "nenhum lote gravado antes da falha (cenário não exercitado)")
+    _conferir(p.abas[C].row_count == len(parcial), "sobraram linhas do layout antigo depois do último lote")
+    meta = g._ler_meta_consolidacao(p)
+    _conferir(meta is None or meta["cabecalho"] != g.hashlib.sha1("\x1f".join(parcial[0]).encode('utf-8')).hexdigest(),
+              "meta continua válido depois de uma reconstrução que falhou")
+    _conferir(espelho_local.ler_aba(C).values.tolist() == espelho, "espelho alterado por uma reconstrução que falhou")
+    r = g.consolidar_geral_para_dashboard()
+    _conferir("reconstrução completa" in r, f"nova tentativa: {r}")
+    final = p.abas[C].get_all_values()
+    _conferir(final[:len(parcial)] == parcial and len(final) > len(parcial), "aba parcial não é um prefixo da reconstrução")
+    _conferir(p.abas[C].id == id_aba and list(p.abas) == ordem, "aba consolidada trocada na nova tentativa")
+    _conferir_consolidada(p, "nova tentativa")
+    return f"{len(parcial) - 1} de {len(final) - 1} linhas antes da falha em '{alvo}'"
+
+
+def verificar_concorrencia(n_linhas, n_meses):
+    p = _planilha(n_linhas, n_meses)
+    mes = g.obter_nome_aba_mes_atual()
+    g.sincronizar_meses([mes])
+    antes = _ids(p, mes)
+    # A origem perde 5 tarefas do mês (a sincronização vai remover linhas) e outra ação apaga uma terceira
+    origem = p.abas[g.PLANILHA_ORIGEM_NOME].celulas; col = origem[0].index('Link')
+    tirar = set(antes[10:15]); alvo = antes[3]
+    origem[:] = [origem[0]] + [l for l in origem[1:] if l[col].split('/')[-1] not in tirar]
+    g.invalidar_snapshot_origem()
+    # A deleção dispara quando a sincronização já leu a aba de mês e ainda não gravou
+    original = p.values_batch_get; delecao = []
+    def ler_e_disparar(ranges, params=None):
+        r = original(ranges, params)
+        if not delecao and f"'{mes}'" in ranges:
+            delecao.append(threading.Thread(target=g.deletar_tarefas_global, args=([alvo],)))
+            delecao[0].start(); time.sleep(0.3)
+        return r
+    p.values_batch_get = ler_e_disparar
+    try: g.sincronizar_meses([mes])
+    finally: p.values_batch_get = original
+    _conferir(delecao, "a deleção concorrente não foi disparada")
+    delecao[0].join()
+    depois = _ids(p, mes)
+    _conferir(len(depois) == len(set(depois)), "linhas duplicadas na aba de mês")
+    _conferir(sorted(depois) == sorted(i for i in antes if i not in tirar and i != alvo),
+              "aba de mês diferente do esperado (escritas posicionais se cruzaram)")
+
+    # Cota: duas ações simultâneas, uma com pool de threads, cada uma vê só as próprias chamadas
+    limitador = cota_sheets.LIMITADOR
+    cota_sheets.LIMITADOR = cota_sheets.LimitadorCota(100_000, 100_000)
+    try:
+        def acao(nome, chamadas, com_pool):
+            with perfil_acoes.perfilar_acao(nome):
+                uma = lambda _: cota_sheets.LIMITADOR.antes_da_chamada("leitura")
+                if com_pool:
+                    with ThreadPoolExecutor(3) as pool: list(pool.map(perfil_acoes.propagar(uma), range(chamadas)))
+                else:
+                    for i in range(chamadas): uma(i)
+        threads = [threading.Thread(target=acao, args=("A", 30, True)), threading.Thread(target=acao, args=("B", 7, False))]
+        for t in threads: t.start()
+        for t in threads: t.join()
+        uso = cota_sheets.LIMITADOR.uso_por_acao()
+        _conferir(uso["A"]["leituras"] == 30 and uso["B"]["leituras"] == 7,
+                  f"cota misturada entre ações: A={uso['A']['leituras']} B={uso['B']['leituras']}")
+        total = cota_sheets.LIMITADOR.instantaneo()["leituras"]
+        _conferir(total == 37, f"total do processo: {total} leituras (esperado 37)")
+    finally:
+        cota_sheets.LIMITADOR = limitador
+    return "sincronização x deleção, cota por ação"
+
+
+def verificar_historico(n_linhas, n_meses):
+    # Quadro montado à mão (não usa a planilha falsa): valores esperados contados dia a dia
+    T = pd.Timestamp; N = pd.NaT
+    tarefas = [ # (semana, arquivada, Data Final)
+        ("2026-09-28", False, N), ("2026-09-28", False, N),                  # semana sem nenhuma fechada
+        ("2026-10-05", False, T("2026-10-06 15:00")), ("2026-10-05", False, T("2026-10-08")),
+        ("2026-10-05", False, N), ("2026-10-05", True, T("2026-10-05")),     # arquivada: fora da conta
+        ("2026-10-12", False, T("2026-10-12")), ("2026-10-12", False, T("2026-10-20")), # futura: conta como hoje
+        ("2026-10-12", False, N),
+        ("2026-10-19", False, T("2026-10-19")),                              # semana futura: fora
+    ]
+    df = pd.DataFrame({g.COL_SEMANA_INICIO: pd.to_datetime([t[0] for t in tarefas]),
+                       g.COL_ARQUIVADA: [t[1] for t in tarefas],
+                       g.COL_DATA_FINAL: pd.to_datetime(pd.Series([t[2] for t in tarefas]))})
+    # (Data, Total_Fechadas, Total_Tarefas); as semanas anteriores não dependem de hoje
+    anteriores = [("28/09", 0, 2), ("29/09", 0, 2), ("30/09", 0, 2), ("01/10", 0, 2), ("02/10", 0, 2),
+                  ("05/10", 0, 3), ("06/10", 1, 3), ("07/10", 1, 3), ("08/10", 2, 3), ("09/10", 2, 3)]
+    casos = [
+        ("segunda", "2026-10-12", [("12/10", 2, 3)]),
+        ("quarta", "2026-10-14", [("12/10", 1, 3), ("13/10", 1, 3), ("14/10", 2, 3)]),
+        # Sábado: dias úteis da semana + a linha extra de hoje (a tarefa de 20/10 só fecha nela)
+        ("sábado", "2026-10-17", [("12/10", 1, 3), ("13/10", 1, 3), ("14/10", 1, 3), ("15/10", 1, 3),
+                                  ("16/10", 1, 3), ("17/10", 2, 3)]),
+    ]
+    for nome, hoje, semana_atual in casos:
+        serie = g.serie_historico_semanal(df, hoje)
+        _conferir(list(serie.columns) == g.CABECALHO_HISTORICO, f"{nome}: colunas {list(serie.columns)}")
+        obtido = [(d.strftime("%d/%m"), f, t) for d, f, t in serie.itertuples(index=False)]
+        _conferir(obtido == anteriores + semana_atual, f"{nome}: série {obtido}")
+    serie = g.serie_historico_semanal(df.iloc[:0], "2026-10-17")
+    obtido = [(d.strftime("%d/%m"), f, t) for d, f, t in serie.itertuples(index=False)]
+    _conferir(obtido == [("17/10", 0, 0)], f"sem tarefas: série {obtido}")
+    return f"{len(casos)} dias de hoje + quadro vazio"
+
+
+def verificar_datas(n_linhas, n_meses):
+    # conversao_datas.analisar_datas com os formatos que aparecem na 'Data Final' (ISO e BR misturados)
+    T = pd.Timestamp; N = pd.NaT
+    casos = [ # (texto, data esperada)
+        ("2026-10-05", T("2026-10-05")), ("05/10/2026", T("2026-10-05")),           # ISO e BR puros
+        ("2026-10-05 14:30:00", T("2026-10-05 14:30")), ("2026-10-05T08:00", T("2026-10-05 08:00")),
+        ("5/1/2026", T("2026-01-05")), ("05/1/2026", T("2026-01-05")),               # dia/mês com 1 dígito
+        (" 06/10/2026 ", T("2026-10-06")), ("05/10/2026", T("2026-10-05")),         # espaços; repetido
+        ("0", N), ("#N/A", N), ("", N), (None, N),                                   # vazios
+        ("amanhã", N), ("31/02/2026", N), ("2026-13-01", N),                         # ilegíveis
+    ]
+    serie = pd.Series([c[0] for c in casos], index=range(100, 100 + len(casos)), name="Data Final")
+    datas, invalidos = conversao_datas.analisar_datas(serie)
+    _conferir(datas.index.equals(serie.index) and datas.name == serie.name, "datas fora do índice da série")
+    _conferir(str(datas.dtype).startswith("datetime64"), f"tipo {datas.dtype}")
+    for (texto, esperada), obtida in zip(casos, datas):
+        _conferir((pd.isna(esperada) and pd.isna(obtida)) or obtida == esperada, f"{texto!r}: {obtida} (esperado {esperada})")
+    _conferir(invalidos == ["amanhã", "31/02/2026", "2026-13-01"], f"inválidos {invalidos}")
+    return f"{len(casos)} valores"
+
+
+VERIFICACOES = {
+    "consolidacao": verificar_consolidacao,
+    "escrita": verificar_escrita_diferencial,
+    "delecao": verificar_delecao,
+    "falha": verificar_falha_na_reconstrucao,
+    "concorrencia": verificar_concorrencia,
+    "historico": verificar_historico,
+    "datas": verificar_datas,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Verificações de regressão do motor contra a planilha falsa.")
+    parser.add_argument("--linhas", type=int, default=3000)
+    parser.add_argument("--meses", type=int, default=6)
+    parser.add_argument("--so", nargs="+", choices=list(VERIFICACOES), help="roda só estas verificações")
+    args = parser.parse_args()
+
+    falhas = 0
+    for nome in args.so or VERIFICACOES:
+        inicio = time.perf_counter()
+        try:
+            detalhe = VERIFICACOES[nome](args.linhas, args.meses)
+            print(f"OK     {nome:<14} {time.perf_counter() - inicio:6.2f} s  {detalhe}")
+        except Falha as e:
+            falhas += 1
+            print(f"FALHA  {nome:<14} {time.perf_counter() - inicio:6.2f} s  {e}")
+        except Exception:
+            falhas += 1
+            print(f"FALHA  {nome:<14} {time.perf_counter() - inicio:6.2f} s  exceção:")
+            traceback.print_exc()
+        sys.stdout.flush()
+    armazenamento.definir_planilha(None)
+    sys.exit(1 if falhas else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+# ==============================================================================
+# VISÃO EM MEMÓRIA DAS ABAS ESPELHADAS (TELA PRINCIPAL)
+# ==============================================================================
+# A aba exibida na tela é lida do espelho local uma vez e guardada em memória
+# (por processo: todas as sessões), junto com índices prontos: ID -> linhas e
+# Encarregado -> linhas. Filtro e busca viram consultas a dicionários, sem I/O
+# e sem varrer a tabela.
+# A cópia é descartada quando o espelho muda: gravações deste processo são
+# percebidas na hora (espelho_local.geracao_local); as de outros processos (CLI)
+# pela 'versao' do espelho, conferida no máximo a cada VISAO_TTL segundos.
+# obter_visao(aba, forcar=True) recarrega na hora.
+# Nada aqui importa o Streamlit.
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+import espelho_local
+from conversao_datas import converter_data_robusta
+
+VISAO_TTL = 30 # segundos entre conferências da versão no SQLite
+VISOES_EM_CACHE = 4 # abas guardadas (as menos usadas saem primeiro)
+
+_lock = threading.Lock()
+_cache = OrderedDict() # aba -> {"visao", "geracao", "conferido_em"}
+
+
+class VisaoAba:
+    """DataFrame de uma aba espelhada + índices. Não altere 'df' in-place (é compartilhado)."""
+
+    def __init__(self, aba, df, versao, atualizado_em):
+        self.aba = aba
+        self.df = df
+        self.versao = versao
+        self.atualizado_em = atualizado_em
+        self.linhas_por_id = df.groupby('ID', sort=False).indices if 'ID' in df.columns else {}
+        self.linhas_por_encarregado = df.groupby('Encarregado', sort=True).indices if 'Encarregado' in df.columns else {}
+        self.encarregados = sorted(self.linhas_por_encarregado)
+        self._postos = {} # coluna -> posto (denso) de cada linha na ordenação crescente; vazias = inf
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.df)
+
+    def selecionar(self, busca_id=None, encarregados=None):
+        """
+        Posições (na ordem da aba) das linhas pedidas: busca por ID tem prioridade sobre 'encarregados'
+        (lista vazia => nenhuma linha); sem nenhum dos dois, todas.
+        """
+        if busca_id: return self.linhas_por_id.get(str(busca_id).strip(), np.array([], dtype=int))
+        if encarregados is not None:
+            partes = [self.linhas_por_encarregado[e] for e in encarregados if e in self.linhas_por_encarregado]
+            return np.sort(np.concatenate(partes)) if partes else np.array([], dtype=int)
+        return np.arange(len(self.df))
+
+    def postos(self, coluna):
+        """
+        Posto de cada linha na ordenação crescente por 'coluna' (calculado uma vez por versão); empates
+        têm o mesmo posto e vazias ficam com inf. O espelho guarda texto: colunas só com números ordenam
+        como número, colunas 'Data...' como data.
+        """
+        with self._lock:
+            if coluna not in self._postos:
+                serie = self.df[coluna]
+                preenchida = serie != ''
+                numeros = pd.to_numeric(serie.where(preenchida), errors='coerce')
+                if preenchida.any() and numeros[preenchida].notna().all(): chave = numeros
+                elif str(coluna).startswith('Data'): chave = converter_data_robusta(serie)
+                else: chave = serie.str.lower().where(preenchida)
+                self._postos[coluna] = chave.rank(method='dense').fillna(np.inf).to_numpy()
+            return self._postos[coluna]
+
+    def pagina(self, posicoes, numero=1, tamanho=100, ordenar_por=None, crescente=True, colunas=None):
+        """
+        Fatia 'numero' (1-based) de 'posicoes' com 'tamanho' linhas, já ordenada e só com 'colunas'.
+        Apenas essa fatia é montada como DataFrame.
+        """
+        if ordenar_por in self.df.columns:
+            postos = self.postos(ordenar_por)[posicoes]
+            if not crescente: postos = np.where(np.isinf(postos), np.inf, -postos) # vazias continuam no fim
+            posicoes = posicoes[np.argsort(postos, kind='stable')]
+        inicio = (numero - 1) * tamanho
+        fatia = self.df.iloc[posicoes[inicio:inicio + tamanho]]
+        return fatia[[c for c in colunas if c in fatia.columns]] if colunas is not None else fatia
+
+
+def obter_visao(aba, forcar=False):
+    """VisaoAba de 'aba' a partir do espelho local, ou None se a aba ainda não foi espelhada."""
+    with _lock:
+        entrada = _cache.get(aba)
+        geracao = espelho_local.geracao_local(aba)
+        if entrada is not None and not forcar and entrada["geracao"] == geracao:
+            if time.time() - entrada["conferido_em"] < VISAO_TTL:
+                _cache.move_to_end(aba)
+                return entrada["visao"]
+            info = espelho_local.info_aba(aba)
+            if info is not None and info["versao"] == entrada["visao"].versao:
+                entrada["conferido_em"] = time.time()
+                _cache.move_to_end(aba)
+                return entrada["visao"]
+        info = espelho_local.info_aba(aba)
+        df = espelho_local.ler_aba(aba) if info is not None else None
+        if df is None:
+            _cache.pop(aba, None)
+            return None
+        visao = VisaoAba(aba, df, info["versao"], info["atualizado_em"])
+        _cache[aba] = {"visao": visao, "geracao": geracao, "conferido_em": time.time()}
+        _cache.move_to_end(aba)
+        while len(_cache) > VISOES_EM_CACHE: _cache.popitem(last=False)
+        return visao
+
+
+def invalidar_visao(aba=None):
+    """Descarta a cópia em memória (de uma aba ou de todas)."""
+    with _lock:
+        if aba is None: _cache.clear()
+        else: _cache.pop(aba, None)